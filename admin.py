@@ -1,444 +1,365 @@
 # admin.py - Interface Admin CONNECTÉE à PostgreSQL
 import streamlit as st
 import pandas as pd
-import psycopg2
 from datetime import datetime, timedelta
 import time
+from catalogue import SQL
+from conflits import detecter_conflits
+from ecriture import remplacer_surveillances
+from surveillances import affecter_surveillances
+from db import connexion, lire_sql, executer
+from instantane import examens_detailles, inscriptions_examens
+from mesures import mesures, definir_page
+import jobs
 
 # ============================================
 # CONNEXION À POSTGRESQL
 # ============================================
 
-@st.cache_resource
-def init_connection():
-    """Initialise la connexion à PostgreSQL avec encodage UTF-8"""
+def execute_query(query, params=None):
     try:
-        conn = psycopg2.connect(
-            host="localhost",
-            port=5432,
-            database="exams_db",
-            user="postgres",        # à remplacer
-            password="sarah",       # à remplacer
-            options='-c client_encoding=UTF8'
-        )
-        return conn
+        return lire_sql(query, params)
     except Exception as e:
-        st.error(f"Erreur de connexion à la base de données: {e}")
-        return None
-
-conn = init_connection()
-
-def execute_query(query, params=None):
-    if conn:
-        try:
-            return pd.read_sql(query, conn, params=params)
-        except Exception as e:
-            st.error(f"Erreur SQL: {e}")
-            return pd.DataFrame()
-    return pd.DataFrame()
+        st.error(f"Erreur SQL: {e}")
+        return pd.DataFrame()
 
 def execute_update(query, params=None):
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params or ())
-            conn.commit()
-            return True
-        except Exception as e:
-            conn.rollback()
-            st.error(f"Erreur mise à jour: {e}")
-            return False
-    return False
+    try:
+        executer(query, params)
+        return True
+    except Exception as e:
+        st.error(f"Erreur mise à jour: {e}")
+        return False
 
 # ============================================
-# CONFIGURATION DE LA PAGE
+# TÂCHES EN ARRIÈRE-PLAN (worker : python jobs.py)
 # ============================================
 
-st.set_page_config(
-    page_title="Admin - Planning Examens",
-    page_icon="🔧",
-    layout="wide"
-)
+STATUTS_ACTIFS = ("en attente", "en cours")
+TYPES_GENERATION = ["generation", "generation_faculte"]
+INTERVALLE_SUIVI = 2  # secondes entre deux rafraîchissements de la page
 
-# ============================================
-# SIDEBAR
-# ============================================
+def dernier_resultat(types):
+    """Résultat de la dernière tâche terminée de ces types (None s'il n'y en a pas)."""
+    df_jobs = jobs.lister(types)
+    termines = df_jobs[df_jobs["statut"] == "terminé"]
+    if termines.empty:
+        return None
+    return jobs.resultat(int(termines["id"].iloc[0]))
 
-with st.sidebar:
-    st.title("Administration")
-    st.markdown("---")
+def afficher_jobs(types):
+    """Suivi des tâches : progression, annulation, puis relance de la page tant qu'une tâche tourne."""
+    df_jobs = jobs.lister(types)
+    if df_jobs.empty:
+        return None
+    # Écritures faites dans le worker : caches de ce processus à invalider
+    jobs.termines_vus(df_jobs)
+
+    st.subheader("Tâches")
+    st.dataframe(df_jobs, use_container_width=True)
 
-    
-    page = st.radio(
-        "Navigation",
-        ["Génération EDT", "Détection Conflits", "Optimisation Ressources"]
-    )
-    
-    st.markdown(f"**Date :** {datetime.now().strftime('%d/%m/%Y')}")
-    
-    if st.button("Déconnexion", use_container_width=True): 
-        st.success("Déconnecté !")
+    actifs = df_jobs[df_jobs["statut"].isin(STATUTS_ACTIFS)]
+    for job in actifs.to_dict("records"):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.progress(int(job["progression"]), text=f"Tâche {job['id']} : {job['message'] or job['statut']}")
+        with col2:
+            if st.button("Annuler", key=f"annuler_{job['id']}"):
+                jobs.annuler(int(job["id"]))
+                st.rerun()
+
+    dernier = df_jobs.iloc[0]
+    if dernier["statut"] == "échoué":
+        st.error(f"Tâche {dernier['id']} échouée : {dernier['message']}")
+    elif dernier["statut"] == "annulé":
+        st.warning(f"Tâche {dernier['id']} annulée")
+
+    if not actifs.empty:
+        time.sleep(INTERVALLE_SUIVI)
+        st.rerun()
+
+    return dernier_resultat(types)
 
 # ============================================
-# PAGE: GÉNÉRATION EDT
+# INTERFACE ADMIN
 # ============================================
-if page == "Génération EDT":
-    st.title("Génération automatique d'EDT")
-
-    # -----------------------------
-    # Sélection du périmètre
-    # -----------------------------
-    st.header("Sélection du périmètre")
-
-    df_dept = execute_query(
-        "SELECT id, nom FROM planning.departements ORDER BY nom;"
-    )
-
-    departement = st.selectbox(
-        "Département",
-        df_dept["nom"].tolist(),
-        key="gen_dept"
-    )
-
-    dept_id = int(
-        df_dept.loc[df_dept["nom"] == departement, "id"].iloc[0]
-    )
-
-    df_form = execute_query(
-        "SELECT id, nom FROM planning.formations WHERE dept_id = %s ORDER BY nom;",
-        (dept_id,)
-    )
-
-    if df_form.empty:
-        st.error("Aucune formation trouvée")
-        formation_id = None
-    else:
-        formation = st.selectbox(
-            "Formation",
-            df_form["nom"].tolist(),
-            key="gen_form"
+
+def interface_admin(user):
+    definir_page("admin")
+
+    # ============================================
+    # SIDEBAR
+    # ============================================
+
+    with st.sidebar:
+        st.title("Administration")
+        st.markdown("---")
+
+
+        page = st.radio(
+            "Navigation",
+            ["Génération EDT", "Détection Conflits", "Optimisation Ressources", "Surveillances", "Performances SQL"]
         )
-        formation_id = int(
-            df_form.loc[df_form["nom"] == formation, "id"].iloc[0]
+
+        st.markdown(f"**Date :** {datetime.now().strftime('%d/%m/%Y')}")
+
+        if st.button("Déconnexion", use_container_width=True): 
+            st.success("Déconnecté !")
+
+    # ============================================
+    # PAGE: GÉNÉRATION EDT
+    # ============================================
+    if page == "Génération EDT":
+        st.title("Génération automatique d'EDT")
+
+        # -----------------------------
+        # Sélection du périmètre
+        # -----------------------------
+        st.header("Sélection du périmètre")
+
+        perimetre = st.radio(
+            "Périmètre",
+            ["Une formation", "Toute la faculté"],
+            horizontal=True,
+            key="gen_perimetre"
         )
 
-    # -----------------------------
-    # Période
-    # -----------------------------
-    with st.form("form_gen_edt"):
-        col1, col2 = st.columns(2)
-        with col1:
-            date_debut = st.date_input(
-                "Date début",
-                value=datetime.now(),
-                key="gen_date_debut"
-            )
-        with col2:
-            date_fin = st.date_input(
-                "Date fin",
-                value=datetime.now() + timedelta(days=14),
-                key="gen_date_fin"
+        # Toute la faculté : un département par processus, salles réconciliées ensuite
+        if perimetre == "Toute la faculté":
+            dept_id, formation_id = None, None
+        else:
+            df_dept = execute_query(SQL["commun.departements"])
+
+            departement = st.selectbox(
+                "Département",
+                df_dept["nom"].tolist(),
+                key="gen_dept"
             )
 
-        submit = st.form_submit_button("Générer EDT")
+            dept_id = int(
+                df_dept.loc[df_dept["nom"] == departement, "id"].iloc[0]
+            )
 
-    # -----------------------------
-    # Génération réelle
-    # -----------------------------
-    if submit:
-        if formation_id is None:
-            st.error("Formation invalide")
-        else:
-            with st.spinner("Génération en cours..."):
-                progress = st.progress(0)
+            df_form = execute_query(SQL["commun.formations_departement"], (dept_id,))
 
-                modules = execute_query(
-                    "SELECT id, nom FROM planning.modules WHERE formation_id = %s;",
-                    (formation_id,)
+            if df_form.empty:
+                st.error("Aucune formation trouvée")
+                formation_id = None
+            else:
+                formation = st.selectbox(
+                    "Formation",
+                    df_form["nom"].tolist(),
+                    key="gen_form"
+                )
+                formation_id = int(
+                    df_form.loc[df_form["nom"] == formation, "id"].iloc[0]
                 )
 
-                salles = execute_query(
-                    "SELECT id, nom FROM planning.lieu_examen ORDER BY capacite DESC;"
+        # -----------------------------
+        # Période
+        # -----------------------------
+        with st.form("form_gen_edt"):
+            col1, col2 = st.columns(2)
+            with col1:
+                date_debut = st.date_input(
+                    "Date début",
+                    value=datetime.now(),
+                    key="gen_date_debut"
+                )
+            with col2:
+                date_fin = st.date_input(
+                    "Date fin",
+                    value=datetime.now() + timedelta(days=14),
+                    key="gen_date_fin"
                 )
 
-                if modules.empty or salles.empty:
-                    st.error("Modules ou salles manquants")
+            submit = st.form_submit_button("Générer EDT")
+
+        # -----------------------------
+        # Génération en arrière-plan
+        # -----------------------------
+        if submit:
+            if perimetre == "Toute la faculté":
+                job_id = jobs.soumettre("generation_faculte", {
+                    "date_debut": date_debut.isoformat(),
+                    "date_fin": date_fin.isoformat()
+                })
+                st.info(f"Génération de la faculté lancée (tâche {job_id})")
+            elif formation_id is None:
+                st.error("Formation invalide")
+            else:
+                job_id = jobs.soumettre("generation", {
+                    "formation_id": formation_id,
+                    "dept_id": dept_id,
+                    "date_debut": date_debut.isoformat(),
+                    "date_fin": date_fin.isoformat()
+                })
+                st.info(f"Génération lancée (tâche {job_id})")
+
+        resultat = afficher_jobs(TYPES_GENERATION)
+        if resultat:
+            if resultat["inseres"]:
+                st.success("EDT généré")
+                st.dataframe(pd.DataFrame(resultat["inseres"]), use_container_width=True)
+
+            if resultat["rejets"]:
+                st.warning("Certains examens n'ont pas été générés")
+                st.dataframe(pd.DataFrame(resultat["rejets"]), use_container_width=True)
+
+
+    # ============================================
+    # PAGE: DÉTECTION CONFLITS
+    # ============================================
+
+    elif page == "Détection Conflits":
+        st.title("Détection des conflits")
+
+        # Les chevauchements salle / professeur sont refusés à l'écriture par la base
+        resultat = dernier_resultat(TYPES_GENERATION)
+        conflits_chargement = resultat["conflits"] if resultat else []
+        if conflits_chargement:
+            st.subheader("Conflits refusés lors du dernier chargement")
+            st.dataframe(pd.DataFrame(conflits_chargement), use_container_width=True)
+
+        if st.button("Scanner les conflits", type="primary", use_container_width=True):
+            # Examens et inscriptions lus depuis l'instantané partagé (pas de relecture SQL)
+            df_examens = examens_detailles()
+            # Un examen par module et horaire : les salles d'un même module ne se gênent pas
+            df_inscriptions = inscriptions_examens(df_examens.drop_duplicates(["module_id", "date_heure"]))
+
+            if df_examens.empty:
+                st.success("✅ Aucun examen dans la base")
+            else:
+                # Balayage par ressource (salle, professeur, étudiant) en O(n log n)
+                conflits_df = detecter_conflits(df_examens, df_inscriptions)
+
+                if conflits_df.empty:
+                    st.success("✅ Aucun conflit détecté !")
                 else:
-                    inserted = []
-                    failed = []
-
-                    total = len(modules)
-
-                    for i, row in modules.iterrows():
-                        module_id = int(row["id"])
-                        module_nom = row["nom"]
-
-                        salle = salles.iloc[i % len(salles)]
-                        salle_id = int(salle["id"])
-                        salle_nom = salle["nom"]
-
-                        jour = i % max(1, (date_fin - date_debut).days + 1)
-                        exam_date = date_debut + timedelta(days=jour)
-                        exam_time = datetime.strptime("08:00", "%H:%M").time()
-                        exam_datetime = datetime.combine(exam_date, exam_time) + timedelta(hours=(i % 5) * 2)
-
-                        query_insert = """
-                            INSERT INTO planning.examens
-                            (module_id, prof_id, salle_id, date_heure, duree_minutes)
-                            SELECT %s, p.id, %s, %s, 120
-                            FROM planning.professeurs p
-                            WHERE p.dept_id = %s
-                            LIMIT 1;
-                        """
-
-                        ok = execute_update(
-                            query_insert,
-                            (
-                                module_id,
-                                salle_id,
-                                exam_datetime,
-                                dept_id
-                            )
-                        )
-
-                        if ok:
-                            inserted.append({
-                                "Matiere": module_nom,
-                                "Salle": salle_nom,
-                                "Date_Heure": exam_datetime
-                            })
-                        else:
-                            failed.append({
-                                "Matiere": module_nom,
-                                "Raison": "Trigger ou insertion refusée"
-                            })
-
-                        progress.progress(int((i + 1) / total * 100))
-
-                    if inserted:
-                        st.success("EDT généré")
-                        st.dataframe(pd.DataFrame(inserted), use_container_width=True)
-
-                    if failed:
-                        st.warning("Certains examens n'ont pas été générés")
-                        st.dataframe(pd.DataFrame(failed), use_container_width=True)
+                    st.dataframe(conflits_df, use_container_width=True)
 
+    # ============================================
+    # PAGE: OPTIMISATION DES RESSOURCE
+    # ============================================
+    elif page == "Optimisation Ressources":
+        st.title("Optimisation des ressources")
 
-# ============================================
-# PAGE: DÉTECTION CONFLITS
-# ============================================
+        if st.button("Optimiser toutes les ressources", type="primary"):
+            job_id = jobs.soumettre("optimisation")
+            st.info(f"Optimisation lancée (tâche {job_id})")
 
-elif page == "Détection Conflits":
-    st.title("Détection des conflits")
-    
-    if st.button("Scanner les conflits", type="primary", use_container_width=True):
-        # Récupération de tous les examens
-        query_examens = """
-        SELECT 
-            e.id,
-            e.module_id,
-            e.prof_id,
-            e.salle_id,
-            e.date_heure,
-            e.duree_minutes,
-            p.nom as professeur,
-            l.nom as salle
-        FROM planning.examens e
-        JOIN planning.professeurs p ON e.prof_id = p.id
-        JOIN planning.lieu_examen l ON e.salle_id = l.id;
-        """
-        df_examens = execute_query(query_examens)
-
-        # Récupération des inscriptions étudiants avec examen_id
-        query_inscriptions = """
-        SELECT 
-            s.etudiant_id,
-            s.module_id,
-            s.examen_id
-        FROM planning.inscriptions s
-        WHERE s.examen_id IS NOT NULL;
-        """
-        df_inscriptions = execute_query(query_inscriptions)
-
-        if df_examens.empty:
-            st.success("✅ Aucun examen dans la base")
-        else:
-            # Calcul date de fin
-            df_examens['date_fin'] = df_examens['date_heure'] + pd.to_timedelta(df_examens['duree_minutes'], unit='m')
-
-            conflits = []
-
-            # Détection conflits salle et prof
-            for i, e1 in df_examens.iterrows():
-                for j, e2 in df_examens.iterrows():
-                    if i >= j:
-                        continue
-                    # Salle
-                    if e1['salle_id'] == e2['salle_id'] and not (e1['date_fin'] <= e2['date_heure'] or e2['date_fin'] <= e1['date_heure']):
-                        conflits.append({
-                            "Type": "Salle surchargée",
-                            "Détails": f"Salle {e1['salle']} a 2 examens qui se chevauchent entre {e1['date_heure']} et {e1['date_fin']}"
-                        })
-                    # Prof
-                    if e1['prof_id'] == e2['prof_id'] and not (e1['date_fin'] <= e2['date_heure'] or e2['date_fin'] <= e1['date_heure']):
-                        conflits.append({
-                            "Type": "Conflit professeur",
-                            "Détails": f"Professeur {e1['professeur']} a 2 examens qui se chevauchent entre {e1['date_heure']} et {e1['date_fin']}"
-                        })
-
-            # Détection conflits étudiants
-            if not df_inscriptions.empty:
-                # Fusion sur examen_id pour récupérer les vrais examens de chaque étudiant
-                df_etud_exam = df_inscriptions.merge(df_examens, left_on='examen_id', right_on='id', how='inner')
-                for i, e1 in df_etud_exam.iterrows():
-                    for j, e2 in df_etud_exam.iterrows():
-                        if i >= j:
-                            continue
-                        if e1['etudiant_id'] == e2['etudiant_id'] and not (e1['date_fin'] <= e2['date_heure'] or e2['date_fin'] <= e1['date_heure']):
-                            conflits.append({
-                                "Type": "Conflit étudiant",
-                                "Détails": f"Étudiant ID {e1['etudiant_id']} a 2 examens qui se chevauchent entre {e1['date_heure']} et {e1['date_fin']}"
-                            })
-
-            if not conflits:
-                st.success("✅ Aucun conflit détecté !")
+        # Recuit simulé : enchaînements étudiants, places perdues, charge des professeurs
+        st.subheader("Amélioration du planning")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            budget = st.slider("Budget de calcul (secondes)", 5, 300, 30, step=5)
+        with col2:
+            if st.button("Améliorer", use_container_width=True):
+                job_id = jobs.soumettre("amelioration", {"budget_secondes": budget})
+                st.info(f"Amélioration lancée (tâche {job_id})")
+
+        resultat = afficher_jobs(["optimisation", "amelioration"])
+        if isinstance(resultat, dict):
+            stats = resultat["statistiques"]
+            st.success(f"Amélioration terminée : coût {stats['cout_initial']:.0f} → {stats['cout_final']:.0f}")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Enchaînements étudiants", stats["criteres"]["enchaines"])
+            col2.metric("Places perdues", stats["criteres"]["places_perdues"])
+            col3.metric("Mouvements / s", stats["mouvements_par_seconde"])
+            st.dataframe(pd.DataFrame(resultat["comparaison"]).set_index("Indicateur"), use_container_width=True)
+            if resultat["modifications"]:
+                st.dataframe(pd.DataFrame(resultat["modifications"]), use_container_width=True)
+        elif resultat:
+            st.success("Optimisation complète terminée !")
+            st.dataframe(pd.DataFrame(resultat), use_container_width=True)
+
+
+    # ============================================
+    # PAGE: SURVEILLANCES
+    # ============================================
+    elif page == "Surveillances":
+        st.title("Affectation des surveillances")
+
+        with st.form("form_surveillances"):
+            col1, col2 = st.columns(2)
+            with col1:
+                surv_debut = st.date_input("Date début", value=datetime.now(), key="surv_date_debut")
+            with col2:
+                surv_fin = st.date_input("Date fin", value=datetime.now() + timedelta(days=14), key="surv_date_fin")
+            submit_surv = st.form_submit_button("Affecter les surveillances")
+
+        if submit_surv:
+            df_examens = execute_query(SQL["admin.examens_surveillances"], (surv_debut, surv_fin))
+            df_profs = execute_query(SQL["admin.charge_professeurs"])
+            df_indispos = execute_query(SQL["admin.indisponibilites"])
+
+            if df_examens.empty or df_profs.empty:
+                st.warning("Aucun examen ou professeur sur la période")
             else:
-                # Déduplication
-                conflits_df = pd.DataFrame(conflits).drop_duplicates(subset=["Type","Détails"])
-                st.dataframe(conflits_df, use_container_width=True)
-
-# ============================================
-# PAGE: OPTIMISATION DES RESSOURCE
-# ============================================
-elif page == "Optimisation Ressources":
-    st.title("Optimisation des ressources")
-    
-    if st.button("Optimiser toutes les ressources", type="primary"):
-        st.info("Optimisation en cours...")
-
-        # Récupération des données
-        df_examens = execute_query("""
-            SELECT e.id as examen_id, e.module_id, e.prof_id, e.salle_id, e.date_heure, e.duree_minutes
-            FROM planning.examens e;
-        """)
-        df_salles = execute_query("""
-            SELECT id as salle_id, nom, capacite
-            FROM planning.lieu_examen
-            ORDER BY capacite DESC;
-        """)
-        df_inscriptions = execute_query("""
-            SELECT etudiant_id, examen_id
-            FROM planning.inscriptions
-            WHERE examen_id IS NOT NULL;
-        """)
-
-        if df_examens.empty or df_salles.empty:
-            st.warning("Aucun examen ou salle trouvé pour optimiser")
-        else:
-            df_examens['date_fin'] = df_examens['date_heure'] + pd.to_timedelta(df_examens['duree_minutes'], unit='m')
-            optimisation = []
-
-            # Liste de créneaux possibles (ex: 8h-10h, 10h-12h…)
-            debut_jour = datetime.strptime("08:00:00", "%H:%M:%S").time()
-            fin_jour = datetime.strptime("18:00:00", "%H:%M:%S").time()
-            duree_creneau = 120  # en minutes
-            heures_creneaux = [datetime.combine(datetime.today(), debut_jour) + timedelta(minutes=120*i) 
-                               for i in range(int((fin_jour.hour - debut_jour.hour)*60/duree_creneau))]
-
-            for i, examen in df_examens.iterrows():
-                affecte = False
-                etudiants_exam = df_inscriptions[df_inscriptions['examen_id'] == examen['examen_id']]['etudiant_id'].tolist()
-                
-                # Essayer d'affecter sur le créneau initial
-                for j, salle in df_salles.iterrows():
-                    salle_dispo = all(
-                        (examen['date_fin'] <= e['date_heure'] or e['date_fin'] <= examen['date_heure'])
-                        for e in optimisation if e['salle_id'] == salle['salle_id']
-                    )
-                    prof_dispo = all(
-                        (examen['date_fin'] <= e['date_heure'] or e['date_fin'] <= examen['date_heure'])
-                        for e in optimisation if e['prof_id'] == examen['prof_id']
+                # Les surveillances existantes sont remplacées : on repart des charges sans elles
+                df_actuelles = execute_query(SQL["admin.surveillances_actuelles"], (df_examens["id"].tolist(),))
+                if not df_actuelles.empty:
+                    df_profs = df_profs.merge(df_actuelles, left_on="id", right_on="prof_id", how="left")
+                    df_profs["total_surveillance"] = df_profs["total_surveillance"] - df_profs["nb"].fillna(0)
+
+                affectations, non_couverts = affecter_surveillances(df_examens, df_profs, df_indispos)
+
+                try:
+                    with connexion() as conn:
+                        remplacer_surveillances(conn, df_examens["id"].tolist(), affectations)
+                    st.success(f"{len(affectations)} surveillance(s) affectée(s)")
+                except Exception as e:
+                    st.error(f"Erreur mise à jour: {e}")
+
+                if affectations:
+                    df_aff = pd.DataFrame(affectations)
+                    st.dataframe(
+                        df_aff.groupby("prof_id").size().rename("Surveillances").reset_index(),
+                        use_container_width=True
                     )
-                    etudiants_dispo = all(
-                        (examen['date_fin'] <= e['date_heure'] or e['date_fin'] <= examen['date_heure'])
-                        for e in optimisation if e.get('etudiants', []) and set(e['etudiants']) & set(etudiants_exam)
-                    )
-                    if salle_dispo and prof_dispo and etudiants_dispo:
-                        optimisation.append({
-                            "examen_id": examen['examen_id'],
-                            "salle_id": salle['salle_id'],
-                            "Salle": salle['nom'],
-                            "prof_id": examen['prof_id'],
-                            "date_heure": examen['date_heure'],
-                            "date_fin": examen['date_fin'],
-                            "etudiants": etudiants_exam
-                        })
-                        # Mise à jour salle dans la base
-                        execute_update(
-                            "UPDATE planning.examens SET salle_id = %s WHERE id = %s",
-                            (salle['salle_id'], examen['examen_id'])
-                        )
-                        affecte = True
-                        break
-
-                # Si conflit, tenter de déplacer sur un autre créneau
-                if not affecte:
-                    for h in heures_creneaux:
-                        nouvel_debut = examen['date_heure'].replace(hour=h.hour, minute=h.minute)
-                        nouvel_fin = nouvel_debut + timedelta(minutes=examen['duree_minutes'])
-                        for j, salle in df_salles.iterrows():
-                            salle_dispo = all(
-                                (nouvel_fin <= e['date_heure'] or e['date_fin'] <= nouvel_debut)
-                                for e in optimisation if e['salle_id'] == salle['salle_id']
-                            )
-                            prof_dispo = all(
-                                (nouvel_fin <= e['date_heure'] or e['date_fin'] <= nouvel_debut)
-                                for e in optimisation if e['prof_id'] == examen['prof_id']
-                            )
-                            etudiants_dispo = all(
-                                (nouvel_fin <= e['date_heure'] or e['date_fin'] <= nouvel_debut)
-                                for e in optimisation if e.get('etudiants', []) and set(e['etudiants']) & set(etudiants_exam)
-                            )
-                            if salle_dispo and prof_dispo and etudiants_dispo:
-                                optimisation.append({
-                                    "examen_id": examen['examen_id'],
-                                    "salle_id": salle['salle_id'],
-                                    "Salle": salle['nom'],
-                                    "prof_id": examen['prof_id'],
-                                    "date_heure": nouvel_debut,
-                                    "date_fin": nouvel_fin,
-                                    "etudiants": etudiants_exam
-                                })
-                                execute_update(
-                                    "UPDATE planning.examens SET salle_id = %s, date_heure = %s WHERE id = %s",
-                                    (salle['salle_id'], nouvel_debut, examen['examen_id'])
-                                )
-                                affecte = True
-                                break
-                        if affecte:
-                            break
-
-                if not affecte:
-                    # Aucun créneau dispo
-                    optimisation.append({
-                        "examen_id": examen['examen_id'],
-                        "salle_id": None,
-                        "Salle": "Aucune salle disponible",
-                        "prof_id": examen['prof_id'],
-                        "date_heure": examen['date_heure'],
-                        "date_fin": examen['date_fin'],
-                        "etudiants": etudiants_exam
-                    })
-
-            df_opt = pd.DataFrame(optimisation).sort_values(['date_heure', 'Salle'])
-            st.success("Optimisation complète terminée !")
-            st.dataframe(df_opt.drop(columns=['etudiants']), use_container_width=True)
-
-
-# ============================================
-# FOOTER
-# ============================================
+                if non_couverts:
+                    st.warning("Certains examens n'ont pas assez de surveillants")
+                    st.dataframe(pd.DataFrame(non_couverts), use_container_width=True)
+
+
+    # ============================================
+    # PAGE: PERFORMANCES SQL
+    # ============================================
+    elif page == "Performances SQL":
+        st.title("Performances des requêtes")
+        st.caption(
+            f"Mesures de ce serveur depuis son démarrage ; "
+            f"requête lente : plus de {mesures.seuil_ms} ms (plan relevé)"
+        )
 
-st.markdown("---")
-st.markdown("**Système de planification des examens** - Version 1.0 | © 2025")
+        df_stats = mesures.statistiques()
+        if df_stats.empty:
+            st.info("Aucune requête mesurée")
+        else:
+            pages_filtre = st.multiselect("Pages", sorted(df_stats["page"].unique()))
+            if pages_filtre:
+                df_stats = df_stats[df_stats["page"].isin(pages_filtre)]
+            st.dataframe(df_stats, use_container_width=True)
+
+        st.subheader("Requêtes lentes")
+        lentes = mesures.lentes()
+        if not lentes:
+            st.success("Aucune requête lente")
+        for entree in lentes:
+            with st.expander(
+                f"{entree['date']:%H:%M:%S} · {entree['page']} · {entree['duree_ms']:.0f} ms · {entree['requete'][:80]}"
+            ):
+                st.code(entree["requete"], language="sql")
+                st.code(entree["plan"] or "Plan en cours de relevé...")
+
+        if st.button("Remettre les mesures à zéro"):
+            mesures.reinitialiser()
+            st.rerun()
+
+
+    # ============================================
+    # FOOTER
+    # ============================================
 
+    st.markdown("---")
+    st.markdown("**Système de planification des examens** - Version 1.0 | © 2025")
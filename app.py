@@ -1,6 +1,17 @@
+import importlib
 import streamlit as st
 from auth import authenticate
-from interfaces import doyen, adminexamen, professeur, etudiant, chefdept
+from rafraichissement import demarrer
+
+# Rôle -> (module, fonction d'entrée). Le module n'est importé qu'une fois
+# l'utilisateur connecté : la page de connexion ne charge aucune interface.
+INTERFACES = {
+    "doyen": ("doyen", "interface_doyen"),
+    "vice-doyen": ("doyen", "interface_doyen"),
+    "admin": ("admin", "interface_admin"),
+    "chef_dept": ("chef_dept", "interface_chef_dept"),
+    "professeur": ("professeur", "interface_professeur"),
+}
 
 # Configuration globale
 st.set_page_config(
@@ -81,6 +92,10 @@ input[type=text], input[type=password] {
 </style>
 """, unsafe_allow_html=True)
 
+# Vues matérialisées rafraîchies en tâche de fond (une fois par processus,
+# quelle que soit la page ouverte)
+demarrer()
+
 # Session
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -110,15 +125,10 @@ else:
     user = st.session_state.user
     role = user["role"]
 
-    if role in ["doyen", "vice-doyen"]:
-        doyen.interface_doyen(user)
-    elif role == "admin":
-        adminexamen.interface_adminexamen(user)
-    elif role == ["chef_dept"]:
-        chefdept.interface_chefdept(user)
-    elif role == "professeur":
-        professeur.interface_professeur(user)
+    if role in INTERFACES:
+        module, fonction = INTERFACES[role]
+        getattr(importlib.import_module(module), fonction)(user)
     elif role == "etudiant":
-        etudiant.interface_etudiant(user)
+        st.info("L'espace étudiant n'est pas encore disponible")
     else:
         st.error("Rôle non reconnu")
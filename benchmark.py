@@ -0,0 +1,258 @@
+# benchmark.py - Mesure des traitements des pages admin, doyen et chef_dept
+#
+# À lancer sur une base PostgreSQL locale dédiée (les données sont remplacées) :
+#   python benchmark.py --taille faculte --graine 42
+#   python benchmark.py --sans-chargement              # base déjà remplie
+#   python benchmark.py --enregistrer-reference        # fixe la référence
+# Code de sortie 1 si une mesure régresse par rapport à la référence.
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+import donnees_synthetiques
+from cache import cache_requetes, invalider_tables
+from catalogue import SQL
+from conflits import detecter_conflits
+from db import connexion, lire_sql, lire_plusieurs
+from export import exporter_csv
+from generation import generer_faculte
+from indicateurs import PlanVectorise
+from instantane import instantane, examens_detailles, inscriptions_examens, table
+from optimisation import optimiser_session
+from rafraichissement import rafraichir
+from recuit import ameliorer_session
+from surveillances import affecter_surveillances
+
+REPETITIONS = 3
+TOLERANCE = 0.20            # ralentissement toléré par rapport à la référence
+SEUIL_SECONDES = 0.05       # écart absolu en dessous duquel on parle de bruit
+BUDGET_AMELIORATION = 5     # secondes de recuit (durée fixe : on suit le débit)
+REFERENCE = "benchmark_reference.json"
+DEPT_ID = 1                 # département du chef de département mesuré
+
+
+# =====================================
+# TRAITEMENTS MESURÉS (mêmes appels que les pages)
+# =====================================
+
+def vider_examens(contexte):
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM planning.surveillances")
+            cur.execute("DELETE FROM planning.examens")
+    invalider_tables({"surveillances", "examens"})
+
+
+def admin_generation(contexte):
+    resultat = generer_faculte(contexte["debut"], contexte["fin"])
+    rafraichir()
+    return {"inseres": len(resultat["inseres"]), "rejets": len(resultat["rejets"])}
+
+
+def admin_conflits(contexte):
+    df_examens = examens_detailles()
+    df_inscriptions = inscriptions_examens(df_examens.drop_duplicates(["module_id", "date_heure"]))
+    return {"conflits": len(detecter_conflits(df_examens, df_inscriptions))}
+
+
+def admin_surveillances(contexte):
+    df_examens = lire_sql(SQL["admin.examens_surveillances"], (contexte["debut"], contexte["fin"]), cache=False)
+    df_profs = lire_sql(SQL["admin.charge_professeurs"], cache=False)
+    df_indispos = lire_sql(SQL["admin.indisponibilites"], cache=False)
+    affectations, non_couverts = affecter_surveillances(df_examens, df_profs, df_indispos)
+    return {"affectations": len(affectations), "non_couverts": len(non_couverts)}
+
+
+def admin_optimisation(contexte):
+    return {"examens": len(optimiser_session())}
+
+
+def admin_amelioration(contexte):
+    statistiques = ameliorer_session(BUDGET_AMELIORATION)["statistiques"]
+    return {"mouvements_par_seconde": statistiques["mouvements_par_seconde"]}
+
+
+def doyen_tableau_de_bord(contexte):
+    lire_plusieurs({
+        "kpi": SQL["doyen.indicateurs"],
+        "salles": SQL["doyen.occupation_salles"],
+        "conflits": (SQL["conflits.rapport"], {"dept_id": None}),
+    }, cache=False)
+
+
+def doyen_emplois_du_temps(contexte):
+    lire_sql(SQL["doyen.emplois_du_temps"], cache=False)
+
+
+def doyen_indicateurs(contexte):
+    PlanVectorise(examens_detailles(), table("inscriptions")).resume()
+
+
+def doyen_rapport(contexte):
+    sortie = io.BytesIO()
+    exporter_csv(sortie, "convocations")
+    return {"octets": sortie.tell()}
+
+
+def chef_dept_page(contexte):
+    # Requêtes chargées à l'ouverture de chef_dept.py
+    lire_plusieurs({
+        "stats": (SQL["chef_dept.stats_formations"], (DEPT_ID,)),
+        "examens": (SQL["chef_dept.examens"], (DEPT_ID,)),
+        "conflits": (SQL["conflits.rapport_departement"], {"dept_id": DEPT_ID}),
+    }, cache=False)
+
+
+# (nom, traitement, préparation non chronométrée) dans l'ordre d'exécution :
+# la génération remplit les examens lus par les suivants, l'optimisation et
+# le recuit modifient le planning et passent en dernier
+TRAITEMENTS = [
+    ("admin.generation_faculte", admin_generation, vider_examens),
+    ("admin.detection_conflits", admin_conflits, None),
+    ("admin.surveillances", admin_surveillances, None),
+    ("doyen.tableau_de_bord", doyen_tableau_de_bord, None),
+    ("doyen.emplois_du_temps", doyen_emplois_du_temps, None),
+    ("doyen.indicateurs", doyen_indicateurs, None),
+    ("doyen.rapport_convocations", doyen_rapport, None),
+    ("chef_dept.page", chef_dept_page, None),
+    ("admin.optimisation", admin_optimisation, None),
+    ("admin.amelioration", admin_amelioration, None),
+]
+
+
+# =====================================
+# EXÉCUTION ET COMPARAISON
+# =====================================
+
+def mesurer(traitement, preparation, contexte, repetitions=REPETITIONS):
+    """Durées (caches vidés avant chaque passage) et détails du dernier passage."""
+    durees, details = [], None
+    for _ in range(repetitions):
+        if preparation:
+            preparation(contexte)
+        cache_requetes.vider()
+        instantane.vider()
+        debut = time.perf_counter()
+        details = traitement(contexte)
+        durees.append(time.perf_counter() - debut)
+    return {
+        "secondes": [round(d, 4) for d in durees],
+        "mediane": round(statistics.median(durees), 4),
+        "min": round(min(durees), 4),
+        "details": details or {},
+    }
+
+
+def environnement():
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT version()")
+            version = cur.fetchone()[0]
+            cur.execute("SELECT MIN(date), MAX(date) FROM planning.periodes_examen")
+            debut, fin = cur.fetchone()
+    return {
+        "postgresql": version,
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "processeur": platform.processor(),
+    }, debut, fin
+
+
+def compter_lignes():
+    """Taille du jeu de données mesuré (comparable d'une exécution à l'autre)."""
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute(" UNION ALL ".join(
+                f"SELECT '{t}', COUNT(*) FROM planning.{t}" for t in donnees_synthetiques.ORDRE
+            ))
+            return dict(cur.fetchall())
+
+
+def executer_benchmark(repetitions=REPETITIONS, filtre=None):
+    infos, debut, fin = environnement()
+    if debut is None:
+        raise ValueError("Aucune période d'examen : charger les données d'abord")
+    contexte = {"debut": debut, "fin": fin}
+    mesures = {}
+    for nom, traitement, preparation in TRAITEMENTS:
+        if filtre and not any(f in nom for f in filtre):
+            continue
+        mesures[nom] = mesurer(traitement, preparation, contexte, repetitions)
+        print(f"{nom:30} {mesures[nom]['mediane']:>9.3f} s  {mesures[nom]['details']}")
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "environnement": infos,
+        "lignes": compter_lignes(),
+        "repetitions": repetitions,
+        "mesures": mesures,
+    }
+
+
+def regressions(resultats, reference, tolerance=TOLERANCE, seuil=SEUIL_SECONDES):
+    """Mesures plus lentes que la référence au-delà de la tolérance :
+    [(nom, référence, actuel)]."""
+    lentes = []
+    for nom, mesure in resultats["mesures"].items():
+        avant = reference["mesures"].get(nom)
+        if avant is None:
+            continue
+        if mesure["mediane"] > avant["mediane"] * (1 + tolerance) and mesure["mediane"] - avant["mediane"] > seuil:
+            lentes.append((nom, avant["mediane"], mesure["mediane"]))
+    return lentes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des pages admin / doyen / chef_dept")
+    parser.add_argument("--taille", choices=donnees_synthetiques.TAILLES, default="faculte")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--sans-chargement", action="store_true", help="mesure la base telle quelle")
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS)
+    parser.add_argument("--filtre", nargs="*", help="ne mesure que les traitements dont le nom contient ce texte")
+    parser.add_argument("--sortie", help="fichier JSON des résultats (par défaut horodaté)")
+    parser.add_argument("--reference", default=REFERENCE)
+    parser.add_argument("--enregistrer-reference", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    if not args.sans_chargement:
+        donnees = donnees_synthetiques.generer(args.taille, args.graine)
+        debut = time.perf_counter()
+        donnees_synthetiques.charger(donnees)
+        rafraichir()
+        nb = sum(donnees_synthetiques.resume(donnees).values())
+        print(f"Données chargées ({nb} lignes) en {time.perf_counter() - debut:.1f} s")
+
+    resultats = executer_benchmark(args.repetitions, args.filtre)
+    if not args.sans_chargement:
+        resultats.update(taille=args.taille, graine=args.graine)
+
+    sortie = args.sortie or f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(sortie, "w", encoding="utf-8") as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False, default=str)
+    print(f"Résultats : {sortie}")
+
+    if args.enregistrer_reference:
+        with open(args.reference, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False, default=str)
+        print(f"Référence enregistrée : {args.reference}")
+        sys.exit(0)
+
+    try:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+    except FileNotFoundError:
+        print("Pas de référence : lancer avec --enregistrer-reference pour en créer une")
+        sys.exit(0)
+
+    if reference.get("lignes") != resultats["lignes"]:
+        print("⚠️ Jeu de données différent de la référence : comparaison indicative")
+    lentes = regressions(resultats, reference, args.tolerance)
+    for nom, avant, apres in lentes:
+        print(f"RÉGRESSION {nom} : {avant:.3f} s -> {apres:.3f} s (+{100 * (apres / avant - 1):.0f} %)")
+    if not lentes:
+        print("Aucune régression par rapport à la référence")
+    sys.exit(1 if lentes else 0)
@@ -0,0 +1,106 @@
+# cache.py - Cache des résultats de requêtes (TTL + LRU, invalidé par les écritures)
+import re
+import threading
+import time
+from collections import OrderedDict
+
+TTL_SECONDES = 60
+TAILLE_MAX = 256
+
+# Les vues dépendent des tables qu'elles agrègent
+DEPENDANCES_VUES = {
+    "v_occupation_salles": {"lieu_examen", "examens", "inscriptions"},
+    "v_examens_etudiant": {"etudiants", "inscriptions", "examens"},
+}
+
+_TABLE = re.compile(r"\bplanning\.(\w+)", re.IGNORECASE)
+
+
+def tables_de(query):
+    """Tables du schéma planning citées par une requête (vues développées)."""
+    tables = {t.lower() for t in _TABLE.findall(query)}
+    for vue in list(tables):
+        tables |= DEPENDANCES_VUES.get(vue, set())
+    return tables
+
+
+class CacheRequetes:
+    """Résultats indexés par (SQL, paramètres), partagés entre sessions.
+
+    Chaque entrée expire après ttl secondes ; au-delà de taille_max entrées,
+    la moins récemment utilisée est évincée. Une écriture invalide toutes les
+    entrées qui lisent une des tables touchées.
+
+    Chaque table a un compteur de génération, incrémenté à chaque
+    invalidation : une lecture commencée avant une écriture ne remet pas
+    en cache un résultat déjà périmé (voir db.lire_sql)."""
+
+    def __init__(self, ttl=TTL_SECONDES, taille_max=TAILLE_MAX):
+        self.ttl = ttl
+        self.taille_max = taille_max
+        self._entrees = OrderedDict()   # cle -> (expiration, tables, valeur)
+        self._generations = {}          # table -> nombre d'invalidations (None : vider)
+        self._verrou = threading.Lock()
+
+    @staticmethod
+    def cle(query, params=None):
+        return (query, repr(params))
+
+    def lire(self, cle):
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return None
+            if entree[0] < time.monotonic():
+                del self._entrees[cle]
+                return None
+            self._entrees.move_to_end(cle)
+            return entree[2]
+
+    def generations(self, tables):
+        """Compteurs des tables (et de vider), à relever avant la lecture."""
+        with self._verrou:
+            return {t: self._generations.get(t, 0) for t in set(tables) | {None}}
+
+    def ecrire(self, cle, tables, valeur, generations=None):
+        """Met en cache, sauf si une des tables a été invalidée depuis le
+        relevé generations (lecture concurrente d'une écriture)."""
+        with self._verrou:
+            if generations is not None and any(
+                self._generations.get(t, 0) != g for t, g in generations.items()
+            ):
+                return
+            self._entrees[cle] = (time.monotonic() + self.ttl, tables, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    def invalider(self, tables):
+        tables = set(tables)
+        with self._verrou:
+            for t in tables:
+                self._generations[t] = self._generations.get(t, 0) + 1
+            for cle in [c for c, e in self._entrees.items() if e[1] & tables]:
+                del self._entrees[cle]
+
+    def vider(self):
+        with self._verrou:
+            self._generations[None] = self._generations.get(None, 0) + 1
+            self._entrees.clear()
+
+
+cache_requetes = CacheRequetes()
+_abonnes = []
+
+
+def abonner(fonction):
+    """Enregistre une fonction appelée avec les tables modifiées à chaque écriture."""
+    if fonction not in _abonnes:
+        _abonnes.append(fonction)
+
+
+def invalider_tables(tables):
+    tables = set(tables)
+    cache_requetes.invalider(tables)
+    for fonction in _abonnes:
+        fonction(tables)
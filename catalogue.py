@@ -0,0 +1,293 @@
+# catalogue.py - Catalogue nommé des requêtes SQL de l'application
+#
+# nom -> (SQL, paramètres d'exemple). Les pages et les chargements lisent le
+# SQL dans SQL[nom] ; verification_plans.py passe tout le catalogue sous
+# EXPLAIN avec les paramètres d'exemple (jeu de données de donnees_synthetiques).
+#
+# Hors catalogue : les écritures groupées par execute_values (ecriture.py,
+# VALUES %s construit à l'exécution), la file planning.jobs (quelques lignes)
+# et les COPY / REFRESH (instantane.py, rafraichissement.py).
+#
+# Les requêtes déclarées dans leur module (conflits, export, importation) ne
+# sont ajoutées qu'au premier accès qui en a besoin : la page de connexion
+# (auth.py) n'importe que ce fichier et ne charge pas ces modules.
+import importlib
+import threading
+from datetime import date
+
+# Début et fin de la session générée par donnees_synthetiques
+DEBUT_EXEMPLE = date(2026, 1, 11)
+FIN_EXEMPLE = date(2026, 2, 9)
+
+CATALOGUE = {
+    # =====================================
+    # COMMUN (listes de choix, chargements)
+    # =====================================
+    "commun.departements": ("SELECT id, nom FROM planning.departements ORDER BY nom;", None),
+    "commun.formations_departement": (
+        "SELECT id, nom FROM planning.formations WHERE dept_id = %s ORDER BY nom;", (1,)
+    ),
+    "commun.salles": (
+        "SELECT id, nom, capacite, batiment FROM planning.lieu_examen ORDER BY capacite;", None
+    ),
+    "commun.periodes": ("""
+        SELECT id, date, heure_debut, heure_fin
+        FROM planning.periodes_examen
+        WHERE date BETWEEN %s AND %s
+        ORDER BY date, heure_debut;
+    """, (DEBUT_EXEMPLE, FIN_EXEMPLE)),
+    # Bornes sur date_heure elle-même (et non date_heure::date) : l'index reste utilisable
+    "commun.examens_existants": ("""
+        SELECT prof_id, salle_id, date_heure, duree_minutes
+        FROM planning.examens
+        WHERE date_heure >= %s AND date_heure < %s::date + 1;
+    """, (DEBUT_EXEMPLE, FIN_EXEMPLE)),
+
+    # =====================================
+    # AUTHENTIFICATION
+    # =====================================
+    "auth.utilisateur": ("""
+        SELECT u.id, u.mot_de_passe, r.nom
+        FROM planning.utilisateurs u
+        JOIN planning.roles r ON u.role_id = r.id
+        WHERE u.email=%s AND u.actif=true
+    """, ("admin@univ.dz",)),
+
+    # =====================================
+    # GÉNÉRATION (generation.py)
+    # =====================================
+    # Modules pas encore planifiés
+    "generation.modules_formation": ("""
+        SELECT m.id, m.nom
+        FROM planning.modules m
+        WHERE m.formation_id = %s
+          AND NOT EXISTS (SELECT 1 FROM planning.examens e WHERE e.module_id = m.id);
+    """, (1,)),
+    "generation.inscriptions_formation": ("""
+        SELECT i.etudiant_id, i.module_id
+        FROM planning.inscriptions i
+        JOIN planning.modules m ON i.module_id = m.id
+        WHERE m.formation_id = %s;
+    """, (1,)),
+    "generation.profs_departement": (
+        "SELECT id, nom FROM planning.professeurs WHERE dept_id = %s;", (1,)
+    ),
+    "generation.modules_faculte": ("""
+        SELECT m.id, m.nom, f.dept_id
+        FROM planning.modules m
+        JOIN planning.formations f ON m.formation_id = f.id
+        WHERE NOT EXISTS (SELECT 1 FROM planning.examens e WHERE e.module_id = m.id);
+    """, None),
+    "generation.inscriptions_faculte": ("""
+        SELECT i.etudiant_id, i.module_id, f.dept_id
+        FROM planning.inscriptions i
+        JOIN planning.modules m ON i.module_id = m.id
+        JOIN planning.formations f ON m.formation_id = f.id;
+    """, None),
+    "generation.profs_faculte": ("SELECT id, nom, dept_id FROM planning.professeurs;", None),
+    # Jours où les étudiants ont déjà un examen (modules planifiés auparavant)
+    "generation.jours_etudiants_formation": ("""
+        SELECT DISTINCT c.etudiant_id, c.jour
+        FROM planning.compteur_etudiant_jour c
+        JOIN planning.inscriptions i ON i.etudiant_id = c.etudiant_id
+        JOIN planning.modules m ON i.module_id = m.id
+        WHERE m.formation_id = %s AND c.nb > 0 AND c.jour BETWEEN %s AND %s;
+    """, (1, DEBUT_EXEMPLE, FIN_EXEMPLE)),
+    "generation.jours_etudiants_faculte": ("""
+        SELECT etudiant_id, jour
+        FROM planning.compteur_etudiant_jour
+        WHERE nb > 0 AND jour BETWEEN %s AND %s;
+    """, (DEBUT_EXEMPLE, FIN_EXEMPLE)),
+
+    # =====================================
+    # ADMIN
+    # =====================================
+    "admin.examens_surveillances": ("""
+        SELECT e.id, e.prof_id, e.periode_id, e.date_heure, e.duree_minutes, f.dept_id,
+               LEAST(l.capacite, COALESCE(cm.nb_inscrits, l.capacite)) AS effectif
+        FROM planning.examens e
+        JOIN planning.modules m ON e.module_id = m.id
+        JOIN planning.formations f ON m.formation_id = f.id
+        JOIN planning.lieu_examen l ON e.salle_id = l.id
+        LEFT JOIN planning.compteur_module cm ON cm.module_id = e.module_id
+        WHERE e.date_heure >= %s AND e.date_heure < %s::date + 1;
+    """, (DEBUT_EXEMPLE, FIN_EXEMPLE)),
+    "admin.charge_professeurs": (
+        "SELECT id, dept_id, total_surveillance FROM planning.professeurs;", None
+    ),
+    "admin.indisponibilites": (
+        "SELECT prof_id, periode_id FROM planning.disponibilites WHERE disponible = FALSE;", None
+    ),
+    "admin.surveillances_actuelles": ("""
+        SELECT prof_id, COUNT(*) AS nb
+        FROM planning.surveillances
+        WHERE examen_id = ANY(%s)
+        GROUP BY prof_id;
+    """, ([1, 2, 3],)),
+
+    # =====================================
+    # DOYEN
+    # =====================================
+    # Indicateurs servis par les vues matérialisées (voir bdd1)
+    "doyen.indicateurs": ("SELECT * FROM planning.mv_indicateurs", None),
+    "doyen.occupation_salles": (
+        "SELECT * FROM planning.mv_occupation_salles ORDER BY salle_nom", None
+    ),
+    "doyen.emplois_du_temps": ("""
+        SELECT e.id AS exam_id,
+               m.nom AS module,
+               l.nom AS salle,
+               e.date_heure,
+               e.duree_minutes
+        FROM planning.examens e
+        JOIN planning.modules m ON e.module_id = m.id
+        JOIN planning.lieu_examen l ON e.salle_id = l.id
+        ORDER BY e.date_heure
+    """, None),
+    "doyen.promos": (
+        "SELECT DISTINCT promo FROM planning.etudiants WHERE promo IS NOT NULL ORDER BY promo", None
+    ),
+
+    # =====================================
+    # CHEF DE DÉPARTEMENT
+    # =====================================
+    "chef_dept.stats_formations": ("""
+        SELECT f.nom AS formation, COUNT(e.id) AS nombre_examens
+        FROM planning.formations f
+        LEFT JOIN planning.modules m ON m.formation_id = f.id
+        LEFT JOIN planning.examens e ON e.module_id = m.id
+        WHERE f.dept_id = %s
+        GROUP BY f.nom;
+    """, (1,)),
+    "chef_dept.examens": ("""
+        SELECT
+            e.id,
+            f.nom AS formation,
+            m.nom AS module,
+            p.nom AS professeur,
+            l.nom AS salle,
+            e.date_heure,
+            e.duree_minutes,
+            e.statut
+        FROM planning.examens e
+        JOIN planning.modules m ON e.module_id = m.id
+        JOIN planning.formations f ON m.formation_id = f.id
+        JOIN planning.professeurs p ON e.prof_id = p.id
+        JOIN planning.lieu_examen l ON e.salle_id = l.id
+        WHERE f.dept_id = %s
+        ORDER BY e.date_heure;
+    """, (1,)),
+    "chef_dept.statut_examen": (
+        "UPDATE planning.examens SET statut=%s WHERE id=%s", ("validé", 1)
+    ),
+
+    # =====================================
+    # PROFESSEUR
+    # =====================================
+    "professeur.examens": ("""
+        SELECT e.id, m.nom AS module, l.nom AS salle, e.date_heure, e.duree_minutes, e.statut
+        FROM planning.examens e
+        JOIN planning.modules m ON e.module_id = m.id
+        JOIN planning.lieu_examen l ON e.salle_id = l.id
+        WHERE e.prof_id = %s
+        ORDER BY e.date_heure;
+    """, (1,)),
+    "professeur.proposer_examen": ("""
+        INSERT INTO planning.examens (module_id, prof_id, salle_id, date_heure, duree_minutes, statut)
+        VALUES (%s, %s, %s, %s, %s, 'en attente')
+    """, (1, 1, 1, f"{DEBUT_EXEMPLE} 08:00", 120)),
+    "professeur.conflits": ("""
+        SELECT DATE(e.date_heure) AS jour, COUNT(e.id) AS nb_examens
+        FROM planning.examens e
+        WHERE e.prof_id = %s
+        GROUP BY DATE(e.date_heure)
+        HAVING COUNT(e.id) > 1;
+    """, (1,)),
+    "professeur.surveillances": ("""
+        SELECT s.id, e.date_heure, m.nom AS module, l.nom AS salle, s.priorite_dept
+        FROM planning.surveillances s
+        JOIN planning.examens e ON s.examen_id = e.id
+        JOIN planning.modules m ON e.module_id = m.id
+        JOIN planning.lieu_examen l ON e.salle_id = l.id
+        WHERE s.prof_id = %s;
+    """, (1,)),
+
+}
+
+
+def _requetes_des_modules():
+    """Entrées du catalogue déclarées dans leur module, importé à la demande."""
+    conflits = importlib.import_module("conflits")
+    export = importlib.import_module("export")
+    importation = importlib.import_module("importation")
+    return {
+        "conflits.rapport": (conflits.QUERY_RAPPORT_CONFLITS, {"dept_id": None}),
+        "conflits.rapport_departement": (conflits.QUERY_RAPPORT_CONFLITS, {"dept_id": 1}),
+        **{
+            f"export.{nom}": (requete, {"dept_id": None, "formation_id": None, "promo": None})
+            for nom, requete in export.EXPORTS.items()
+        },
+        **{
+            f"importation.validation_{table}_{i}": (requete, None)
+            for table, requetes in importation.VALIDATION.items()
+            for i, requete in enumerate(requetes, 1)
+        },
+        "importation.validation_prerequis": (importation.VALIDATION_PREREQUIS, None),
+        **{f"importation.fusion_{table}": (requete, None) for table, requete in importation.FUSION.items()},
+        "importation.fusion_prerequis": (importation.FUSION_PREREQUIS, None),
+    }
+
+
+class Catalogue(dict):
+    """Dictionnaire complété par les requêtes des modules au premier nom
+    inconnu ou au premier parcours complet (verification_plans.py)."""
+
+    def __init__(self, entrees, modules):
+        super().__init__(entrees)
+        self._verrou = threading.Lock()
+        self._modules = modules   # fonction -> entrées à ajouter, None une fois ajoutées
+
+    def _completer(self):
+        with self._verrou:
+            if self._modules is not None:
+                self.update(self._modules())
+                self._modules = None
+
+    def __missing__(self, nom):
+        if self._modules is None:
+            raise KeyError(nom)
+        self._completer()
+        return self[nom]
+
+    def __contains__(self, nom):
+        self._completer()
+        return super().__contains__(nom)
+
+    def __iter__(self):
+        self._completer()
+        return super().__iter__()
+
+    def __len__(self):
+        self._completer()
+        return super().__len__()
+
+    def keys(self):
+        self._completer()
+        return super().keys()
+
+    def values(self):
+        self._completer()
+        return super().values()
+
+    def items(self):
+        self._completer()
+        return super().items()
+
+
+CATALOGUE = Catalogue(CATALOGUE, _requetes_des_modules)
+
+# Texte seul, pour les appels
+SQL = Catalogue(
+    {nom: requete for nom, (requete, _) in dict.items(CATALOGUE)},
+    lambda: {nom: requete for nom, (requete, _) in CATALOGUE.items()}
+)
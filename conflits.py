@@ -0,0 +1,189 @@
+# conflits.py - Détection des conflits par balayage (sweep line)
+import heapq
+import numpy as np
+import pandas as pd
+from db import lire_sql
+
+# ============================================
+# BALAYAGE DES INTERVALLES
+# ============================================
+
+def chevauchements(cles, debuts, fins, ids):
+    """Renvoie les paires (cle, id1, id2) d'intervalles [debut, fin) qui se
+    chevauchent pour une même ressource, en O(n log n + k)."""
+    ordre = sorted(range(len(ids)), key=lambda k: (cles[k], debuts[k], fins[k]))
+    paires = []
+    actifs = []          # tas (fin, id) des intervalles encore ouverts
+    cle_courante = None
+
+    for k in ordre:
+        cle, debut, fin, ident = cles[k], debuts[k], fins[k], ids[k]
+        if cle != cle_courante:
+            actifs = []
+            cle_courante = cle
+        # On ferme les intervalles terminés avant le début courant
+        while actifs and actifs[0][0] <= debut:
+            heapq.heappop(actifs)
+        for _, autre in actifs:
+            paires.append((cle, autre, ident))
+        heapq.heappush(actifs, (fin, ident))
+
+    return paires
+
+
+def _paires_ressource(df, colonne):
+    df = df.dropna(subset=[colonne])
+    return chevauchements(
+        df[colonne].tolist(),
+        df["date_heure"].tolist(),
+        df["date_fin"].tolist(),
+        df["id"].tolist()
+    )
+
+# ============================================
+# CONFLITS SALLE / PROFESSEUR / ÉTUDIANT
+# ============================================
+
+def detecter_conflits(df_examens, df_inscriptions=None):
+    """Détecte les conflits salle, professeur et étudiant.
+
+    df_examens : id, prof_id, salle_id, date_heure, duree_minutes, professeur, salle
+    df_inscriptions : etudiant_id, examen_id
+    Renvoie un DataFrame (Type, Détails, examen_1, examen_2)."""
+    colonnes = ["Type", "Détails", "examen_1", "examen_2"]
+    if df_examens.empty:
+        return pd.DataFrame(columns=colonnes)
+
+    df = df_examens.copy()
+    df["date_fin"] = df["date_heure"] + pd.to_timedelta(df["duree_minutes"], unit="m")
+    examens = df.set_index("id")[["date_heure", "date_fin", "salle", "professeur"]].to_dict("index")
+
+    conflits = []
+
+    for _, id1, id2 in _paires_ressource(df, "salle_id"):
+        e1 = examens[id1]
+        conflits.append({
+            "Type": "Salle surchargée",
+            "Détails": f"Salle {e1['salle']} a 2 examens qui se chevauchent entre {e1['date_heure']} et {e1['date_fin']}",
+            "examen_1": id1,
+            "examen_2": id2
+        })
+
+    for _, id1, id2 in _paires_ressource(df, "prof_id"):
+        e1 = examens[id1]
+        conflits.append({
+            "Type": "Conflit professeur",
+            "Détails": f"Professeur {e1['professeur']} a 2 examens qui se chevauchent entre {e1['date_heure']} et {e1['date_fin']}",
+            "examen_1": id1,
+            "examen_2": id2
+        })
+
+    if df_inscriptions is not None and not df_inscriptions.empty:
+        df_etud = df_inscriptions[["etudiant_id", "examen_id"]].merge(
+            df[["id", "date_heure", "date_fin"]], left_on="examen_id", right_on="id", how="inner"
+        )
+        for etudiant_id, id1, id2 in _paires_ressource(df_etud, "etudiant_id"):
+            e1 = examens[id1]
+            conflits.append({
+                "Type": "Conflit étudiant",
+                "Détails": f"Étudiant ID {etudiant_id} a 2 examens qui se chevauchent entre {e1['date_heure']} et {e1['date_fin']}",
+                "examen_1": id1,
+                "examen_2": id2
+            })
+
+    return pd.DataFrame(conflits, columns=colonnes)
+
+# ============================================
+# INDEX INVERSÉ ÉTUDIANT → EXAMENS
+# ============================================
+
+class IndexConflits:
+    """Ensemble des inscrits de chaque examen sous forme de bitset (entier
+    Python, un bit par étudiant).
+
+    « Ces deux examens partagent-ils un étudiant ? » est un ET binaire ; la
+    mémoire reste proportionnelle examens × étudiants / 8, sans auto-jointure
+    des inscriptions ni matrice examen × examen."""
+
+    def __init__(self, df_inscriptions, cle="examen_id"):
+        df = df_inscriptions[["etudiant_id", cle]].dropna().drop_duplicates()
+        df = df.astype({cle: "int64"})
+
+        codes, etudiants = pd.factorize(df["etudiant_id"])
+        self.nb_etudiants = len(etudiants)
+        self.effectifs = df.groupby(cle).size().to_dict()
+        self.bitsets = {}
+        for examen, lignes in pd.Series(codes).groupby(df[cle].to_numpy()):
+            bits = np.zeros(self.nb_etudiants, dtype=bool)
+            bits[lignes.to_numpy()] = True
+            self.bitsets[int(examen)] = int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+        self.examens = sorted(self.bitsets)
+
+    def effectif(self, examen):
+        return self.effectifs.get(examen, 0)
+
+    def en_conflit(self, a, b):
+        """Vrai si les examens a et b ont au moins un étudiant en commun."""
+        return a != b and bool(self.bitsets.get(a, 0) & self.bitsets.get(b, 0))
+
+    def conflit_avec(self, examen, autres):
+        """Vrai si l'examen partage un étudiant avec l'un des examens donnés."""
+        bits = self.bitsets.get(examen, 0)
+        return bool(bits) and any(bits & self.bitsets.get(e, 0) for e in autres if e != examen)
+
+    def voisins(self, examen):
+        """Examens partageant au moins un étudiant avec l'examen donné."""
+        bits = self.bitsets.get(examen, 0)
+        if not bits:
+            return []
+        return [e for e in self.examens if e != examen and bits & self.bitsets[e]]
+
+# ============================================
+# RAPPORT SQL (plages tsrange + index GiST)
+# ============================================
+
+# Chevauchements réels (&&) par salle, professeur et formation.
+# %(dept_id)s à NULL : tous les départements.
+QUERY_RAPPORT_CONFLITS = """
+WITH ex AS (
+    SELECT e.id, e.salle_id, e.prof_id, e.module_id, e.date_heure, e.plage,
+           m.formation_id, f.dept_id
+    FROM planning.examens e
+    JOIN planning.modules m ON e.module_id = m.id
+    JOIN planning.formations f ON m.formation_id = f.id
+)
+SELECT 'Salle' AS type, l.nom AS ressource,
+       e1.id AS exam1, e2.id AS exam2, e1.date_heure AS debut1, e2.date_heure AS debut2
+FROM ex e1
+JOIN planning.examens x2 ON x2.salle_id = e1.salle_id AND x2.plage && e1.plage AND x2.id > e1.id
+JOIN ex e2 ON e2.id = x2.id
+JOIN planning.lieu_examen l ON l.id = e1.salle_id
+WHERE %(dept_id)s IS NULL OR %(dept_id)s IN (e1.dept_id, e2.dept_id)
+
+UNION ALL
+
+SELECT 'Professeur', p.nom,
+       e1.id, e2.id, e1.date_heure, e2.date_heure
+FROM ex e1
+JOIN planning.examens x2 ON x2.prof_id = e1.prof_id AND x2.plage && e1.plage AND x2.id > e1.id
+JOIN ex e2 ON e2.id = x2.id
+JOIN planning.professeurs p ON p.id = e1.prof_id
+WHERE %(dept_id)s IS NULL OR %(dept_id)s IN (e1.dept_id, e2.dept_id)
+
+UNION ALL
+
+SELECT 'Formation', f.nom,
+       e1.id, e2.id, e1.date_heure, e2.date_heure
+FROM ex e1
+JOIN ex e2 ON e2.formation_id = e1.formation_id AND e2.plage && e1.plage
+          AND e2.id > e1.id AND e2.module_id <> e1.module_id
+JOIN planning.formations f ON f.id = e1.formation_id
+WHERE %(dept_id)s IS NULL OR e1.dept_id = %(dept_id)s
+
+ORDER BY debut1, type;
+"""
+
+
+def rapport_conflits(dept_id=None):
+    """Paires d'examens qui se chevauchent, éventuellement pour un département."""
+    return lire_sql(QUERY_RAPPORT_CONFLITS, {"dept_id": dept_id})
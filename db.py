@@ -1,10 +1,235 @@
+import contextvars
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import pandas as pd
 import psycopg2
+from psycopg2 import extensions, pool
+from cache import cache_requetes, tables_de, invalider_tables
+from mesures import mesures
 
-def get_connection():
-    return psycopg2.connect(
-        dbname="exams_db",
-        user="postgres",
-        password="imen",     # 🔴 mets ton vrai mot de passe
-        host="localhost",
-        port="5432"
-    )
+PARAMS_CONNEXION = dict(
+    dbname="exams_db",
+    user="postgres",
+    password="imen",     # 🔴 mets ton vrai mot de passe
+    host="localhost",
+    port="5432",
+    options="-c client_encoding=UTF8"
+)
+
+# Taille du pool partagé par toutes les sessions Streamlit
+# (variables d'environnement PLANNING_POOL_MIN / PLANNING_POOL_MAX)
+POOL_MIN = int(os.environ.get("PLANNING_POOL_MIN", 1))
+POOL_MAX = int(os.environ.get("PLANNING_POOL_MAX", 20))
+# Lectures simultanées d'une même page (lire_plusieurs)
+LECTURES_PARALLELES = 8
+
+_pool = None
+_places = None
+_executeur = None
+_executeur_plans = None
+_verrou = threading.Lock()
+
+# Plans des requêtes lentes : ANALYZE seulement pour les lectures (il réexécute la requête)
+_EXPLICABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+_ECRITURE = re.compile(r"\b(INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+def _relever_plan(entree, sql):
+    """Plan d'une requête lente, relevé sur une autre connexion du pool."""
+    sql = sql.decode(errors="replace") if isinstance(sql, bytes) else (sql or "")
+    if not _EXPLICABLE.match(sql):
+        mesures.plan_releve(entree, "(pas de plan pour cette instruction)")
+        return
+    option = "EXPLAIN " if _ECRITURE.search(sql) else "EXPLAIN (ANALYZE, BUFFERS) "
+    try:
+        with connexion() as conn:
+            # Curseur non mesuré : le plan ne doit pas compter comme une requête de la page
+            with conn.cursor(cursor_factory=extensions.cursor) as cur:
+                cur.execute(option + sql)
+                plan = "\n".join(ligne[0] for ligne in cur.fetchall())
+                conn.rollback()
+    except psycopg2.Error as e:
+        plan = f"(plan indisponible : {e})"
+    mesures.plan_releve(entree, plan)
+
+
+class CurseurMesure(extensions.cursor):
+    """Curseur du pool : chaque requête est chronométrée et comptée dans
+    mesures.py sous la page courante ; les requêtes lentes ont leur plan
+    relevé en arrière-plan.
+
+    Curseur serveur (nommé) : execute n'envoie que le DECLARE, le coût réel
+    est dans les FETCH. Le temps du DECLARE et des fetchone / fetchmany /
+    fetchall est cumulé et enregistré à la fermeture du curseur (l'itération
+    directe, for ligne in cur, n'est pas chronométrée)."""
+
+    _serveur = None   # [requête, durée cumulée, lignes, texte à expliquer]
+
+    def execute(self, query, vars=None):
+        debut = time.perf_counter()
+        resultat = super().execute(query, vars)
+        duree = time.perf_counter() - debut
+        if self.name is None:
+            self._mesurer(query, duree, self.rowcount, self.query)
+        else:
+            self._serveur = [query, duree, 0, self.mogrify(query, vars)]
+        return resultat
+
+    def copy_expert(self, sql, file, size=8192):
+        debut = time.perf_counter()
+        resultat = super().copy_expert(sql, file, size)
+        # Le texte expliqué est celui du COPY (pas de plan), pas self.query :
+        # self.query est encore l'instruction précédente du curseur
+        self._mesurer(sql, time.perf_counter() - debut, self.rowcount, sql)
+        return resultat
+
+    def _chronometrer(self, lecture, *args, **kwargs):
+        debut = time.perf_counter()
+        lignes = lecture(*args, **kwargs)
+        if self._serveur is not None:
+            self._serveur[1] += time.perf_counter() - debut
+            self._serveur[2] += len(lignes) if isinstance(lignes, list) else int(lignes is not None)
+        return lignes
+
+    def fetchone(self):
+        return self._chronometrer(super().fetchone)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._chronometrer(super().fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return self._chronometrer(super().fetchall)
+
+    def close(self):
+        if self._serveur is not None:
+            requete, duree, lignes, a_expliquer = self._serveur
+            self._serveur = None
+            self._mesurer(requete, duree, lignes, a_expliquer)
+        super().close()
+
+    def _mesurer(self, requete, duree, lignes, a_expliquer):
+        entree = mesures.enregistrer(requete, duree, lignes)
+        if entree is not None:
+            global _executeur_plans
+            with _verrou:
+                if _executeur_plans is None:
+                    _executeur_plans = ThreadPoolExecutor(1, thread_name_prefix="plan")
+            _executeur_plans.submit(_relever_plan, entree, a_expliquer)
+
+
+def init_pool(minconn=None, maxconn=None):
+    """Crée (une seule fois par processus) le pool de connexions partagé.
+
+    Tailles par défaut : POOL_MIN / POOL_MAX, lues au moment de la création."""
+    global _pool, _places
+    with _verrou:
+        if _pool is None:
+            minconn = POOL_MIN if minconn is None else minconn
+            maxconn = POOL_MAX if maxconn is None else maxconn
+            _pool = pool.ThreadedConnectionPool(
+                minconn, maxconn, cursor_factory=CurseurMesure, **PARAMS_CONNEXION
+            )
+            # Les emprunts au-delà de maxconn attendent au lieu d'échouer
+            _places = threading.BoundedSemaphore(maxconn)
+    return _pool
+
+
+def fermer_pool():
+    global _pool, _places
+    with _verrou:
+        if _pool is not None:
+            _pool.closeall()
+            _pool, _places = None, None
+
+
+def _en_bonne_sante(conn):
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor(cursor_factory=extensions.cursor) as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+@contextmanager
+def connexion():
+    """Emprunte une connexion au pool et la rend automatiquement.
+
+    Commit en sortie normale, rollback si une exception remonte."""
+    p = init_pool()
+    places = _places
+    places.acquire()
+    try:
+        conn = p.getconn()
+        if not _en_bonne_sante(conn):
+            # Connexion coupée (redémarrage serveur, timeout) : on la remplace
+            p.putconn(conn, close=True)
+            conn = p.getconn()
+    except BaseException:
+        places.release()
+        raise
+
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        p.putconn(conn, close=bool(conn.closed))
+        places.release()
+
+
+def lire_sql(query, params=None, cache=True):
+    """Exécute une lecture sur une connexion empruntée et renvoie un DataFrame.
+
+    Le résultat est servi depuis le cache partagé tant qu'aucune écriture
+    n'a touché les tables lues (cache=False pour forcer la lecture).
+    Les générations des tables sont relevées avant la lecture : si une
+    écriture les invalide pendant celle-ci, le résultat n'est pas mis en cache."""
+    cle = cache_requetes.cle(query, params)
+    tables = tables_de(query)
+    if cache:
+        df = cache_requetes.lire(cle)
+        if df is not None:
+            return df.copy()
+        generations = cache_requetes.generations(tables)
+    with connexion() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    if cache:
+        cache_requetes.ecrire(cle, tables, df, generations)
+    return df.copy()
+
+
+def executer(query, params=None):
+    """Exécute une écriture dans sa propre transaction."""
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params or ())
+    invalider_tables(tables_de(query))
+
+
+def lire_plusieurs(requetes, cache=True):
+    """Exécute des lectures indépendantes en même temps, chacune sur une
+    connexion du pool : la page attend la plus lente, pas leur somme.
+
+    requetes : {nom: query} ou {nom: (query, params)}
+    Renvoie {nom: DataFrame}."""
+    global _executeur
+    with _verrou:
+        if _executeur is None:
+            _executeur = ThreadPoolExecutor(LECTURES_PARALLELES, thread_name_prefix="lecture")
+    futures = {}
+    for nom, requete in requetes.items():
+        query, params = (requete, None) if isinstance(requete, str) else requete
+        # Chaque lecture garde la page appelante (mesures.py)
+        futures[nom] = _executeur.submit(contextvars.copy_context().run, lire_sql, query, params, cache)
+    return {nom: future.result() for nom, future in futures.items()}
@@ -0,0 +1,213 @@
+# donnees_synthetiques.py - Jeu de données synthétique et reproductible pour bdd1
+#
+# Même graine + mêmes tailles = mêmes données. En ligne de commande :
+#   python donnees_synthetiques.py --taille faculte --graine 42
+import argparse
+import io
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from cache import invalider_tables
+from db import connexion
+from generation import DUREE_EXAMEN, HEURES_CRENEAUX
+
+# Tailles prédéfinies ; inscriptions = étudiants x modules de leur formation
+TAILLES = {
+    "petit": {
+        "departements": 2, "formations_par_departement": 4,
+        "modules_par_formation": (4, 6), "etudiants": 400,
+        "professeurs_par_departement": 10, "amphis": 2, "salles_td": 10,
+        "laboratoires": 2, "jours": 10,
+    },
+    # Ordre de grandeur d'une faculté : 13 000 étudiants, ~130 000 inscriptions
+    "faculte": {
+        "departements": 7, "formations_par_departement": 30,
+        "modules_par_formation": (8, 12), "etudiants": 13000,
+        "professeurs_par_departement": 60, "amphis": 12, "salles_td": 60,
+        "laboratoires": 10, "jours": 20,
+    },
+}
+
+CAPACITES = {"amphi": (150, 300), "salle_td": (30, 50), "laboratoire": (20, 30)}
+BATIMENTS = ["A", "B", "C", "D", "E"]
+PART_PREREQUIS = 0.2        # modules ayant un prérequis dans leur formation
+PART_NOTES = 0.3            # inscriptions déjà notées
+PART_INDISPONIBLES = 0.05   # créneaux où un professeur est indisponible
+
+NOMS = ["Benali", "Haddad", "Mansouri", "Bouzid", "Saidi", "Khelifi", "Amrani", "Belkacem",
+        "Cherif", "Djebbar", "Ferhat", "Hamidi", "Kaci", "Larbi", "Meziane", "Rahmani"]
+PRENOMS = ["Amine", "Yasmine", "Karim", "Imane", "Sofiane", "Lina", "Walid", "Sara",
+           "Nassim", "Meriem", "Rayan", "Nour", "Islam", "Ines", "Adel", "Amira"]
+DEPARTEMENTS = ["Informatique", "Mathématiques", "Physique", "Chimie", "Biologie",
+                "Génie civil", "Électronique", "Géologie", "Économie", "Langues"]
+NIVEAUX = ["L1", "L2", "L3", "M1", "M2"]
+
+# Ordre de chargement (clés étrangères)
+ORDRE = ("departements", "formations", "professeurs", "lieu_examen", "modules",
+         "etudiants", "periodes_examen", "disponibilites", "inscriptions")
+
+# Vidées avant chargement (compteurs compris : ils suivent inscriptions et examens)
+TABLES_VIDEES = ORDRE + ("examens", "surveillances", "compteur_module", "compteur_module_jour",
+                         "compteur_etudiant_jour", "compteur_prof_jour")
+
+
+def _noms(rng, n):
+    return rng.choice(NOMS, n), rng.choice(PRENOMS, n)
+
+
+def generer(taille="faculte", graine=42, debut_session=None):
+    """Tables de bdd1 sous forme de DataFrames, {table: DataFrame} dans l'ordre ORDRE.
+
+    taille : clé de TAILLES ou dictionnaire de même forme."""
+    t = TAILLES[taille] if isinstance(taille, str) else taille
+    rng = np.random.default_rng(graine)
+    debut_session = debut_session or date(2026, 1, 11)
+
+    nb_dept = t["departements"]
+    departements = pd.DataFrame({
+        "id": np.arange(1, nb_dept + 1),
+        "nom": [DEPARTEMENTS[i] if i < len(DEPARTEMENTS) else f"Département {i + 1}" for i in range(nb_dept)],
+    })
+
+    nb_form = nb_dept * t["formations_par_departement"]
+    dept_formation = np.repeat(departements["id"].values, t["formations_par_departement"])
+    rang = np.tile(np.arange(t["formations_par_departement"]), nb_dept)
+    mini, maxi = t["modules_par_formation"]
+    modules_formation = rng.integers(mini, maxi + 1, nb_form)
+    formations = pd.DataFrame({
+        "id": np.arange(1, nb_form + 1),
+        "nom": [f"{NIVEAUX[r % len(NIVEAUX)]} parcours {r // len(NIVEAUX) + 1}" for r in rang],
+        "dept_id": dept_formation,
+        "nb_modules": modules_formation,
+    })
+
+    nb_prof = nb_dept * t["professeurs_par_departement"]
+    noms, _ = _noms(rng, nb_prof)
+    professeurs = pd.DataFrame({
+        "id": np.arange(1, nb_prof + 1),
+        "nom": [f"{n} {i}" for i, n in enumerate(noms, 1)],
+        "dept_id": np.repeat(departements["id"].values, t["professeurs_par_departement"]),
+        "specialite": None,
+        "total_surveillance": 0,
+    })
+
+    salles = []
+    for type_salle, cle in (("amphi", "amphis"), ("salle_td", "salles_td"), ("laboratoire", "laboratoires")):
+        bas, haut = CAPACITES[type_salle]
+        for i in range(t[cle]):
+            salles.append({
+                "nom": f"{type_salle.replace('_', ' ').capitalize()} {i + 1}",
+                "capacite": int(rng.integers(bas, haut + 1)),
+                "type": type_salle,
+                "batiment": BATIMENTS[i % len(BATIMENTS)],
+            })
+    lieu_examen = pd.DataFrame(salles)
+    lieu_examen.insert(0, "id", np.arange(1, len(lieu_examen) + 1))
+
+    # Modules : numérotés formation par formation
+    formation_module = np.repeat(formations["id"].values, modules_formation)
+    nb_mod = len(formation_module)
+    ids_modules = np.arange(1, nb_mod + 1)
+    premier = np.repeat(np.cumsum(modules_formation) - modules_formation + 1, modules_formation)
+    prerequis = np.where(
+        (ids_modules > premier) & (rng.random(nb_mod) < PART_PREREQUIS), ids_modules - 1, 0
+    )
+    modules = pd.DataFrame({
+        "id": ids_modules,
+        "nom": [f"Module {i - p + 1} F{f}" for i, p, f in zip(ids_modules, premier, formation_module)],
+        "credits": rng.integers(2, 7, nb_mod),
+        "formation_id": formation_module,
+        "pre_req_id": pd.array(np.where(prerequis > 0, prerequis, None), dtype="Int64"),
+    })
+
+    # Étudiants répartis uniformément entre formations
+    nb_etu = t["etudiants"]
+    noms, prenoms = _noms(rng, nb_etu)
+    formation_etudiant = rng.integers(1, nb_form + 1, nb_etu)
+    etudiants = pd.DataFrame({
+        "id": np.arange(1, nb_etu + 1),
+        "nom": noms,
+        "prenom": prenoms,
+        "formation_id": formation_etudiant,
+        "promo": [f"{NIVEAUX[(f - 1) % t['formations_par_departement'] % len(NIVEAUX)]}-2026"
+                  for f in formation_etudiant],
+    })
+
+    # Chaque étudiant est inscrit à tous les modules de sa formation
+    inscriptions = etudiants[["id", "formation_id"]].rename(columns={"id": "etudiant_id"}).merge(
+        modules[["id", "formation_id"]].rename(columns={"id": "module_id"}), on="formation_id"
+    )[["etudiant_id", "module_id"]]
+    notes = np.round(rng.uniform(0, 20, len(inscriptions)), 2)
+    inscriptions["note"] = np.where(rng.random(len(inscriptions)) < PART_NOTES, notes, np.nan)
+
+    # Jours ouvrés de la session, un créneau par heure de HEURES_CRENEAUX
+    jours, jour = [], debut_session
+    while len(jours) < t["jours"]:
+        if jour.weekday() not in (4, 5):   # ni vendredi ni samedi
+            jours.append(jour)
+        jour += timedelta(days=1)
+    periodes_examen = pd.DataFrame(
+        [(j, f"{h:02d}:00", f"{h + DUREE_EXAMEN // 60:02d}:{DUREE_EXAMEN % 60:02d}")
+         for j in jours for h in HEURES_CRENEAUX],
+        columns=["date", "heure_debut", "heure_fin"]
+    )
+    periodes_examen.insert(0, "id", np.arange(1, len(periodes_examen) + 1))
+
+    indisponibles = rng.random((nb_prof, len(periodes_examen))) < PART_INDISPONIBLES
+    prof_idx, periode_idx = np.nonzero(indisponibles)
+    disponibilites = pd.DataFrame({
+        "id": np.arange(1, len(prof_idx) + 1),
+        "prof_id": professeurs["id"].values[prof_idx],
+        "periode_id": periodes_examen["id"].values[periode_idx],
+        "disponible": False,
+    })
+
+    donnees = {
+        "departements": departements, "formations": formations, "professeurs": professeurs,
+        "lieu_examen": lieu_examen, "modules": modules, "etudiants": etudiants,
+        "periodes_examen": periodes_examen, "disponibilites": disponibilites,
+        "inscriptions": inscriptions,
+    }
+    return {table: donnees[table] for table in ORDRE}
+
+
+def charger(donnees):
+    """Remplace le contenu du schéma planning par les données générées (COPY,
+    une seule transaction). Les comptes utilisateurs ne sont pas touchés."""
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE " + ", ".join(f"planning.{t}" for t in TABLES_VIDEES) + " RESTART IDENTITY")
+            for table, df in donnees.items():
+                tampon = io.StringIO()
+                df.to_csv(tampon, index=False, header=False)
+                tampon.seek(0)
+                cur.copy_expert(
+                    f"COPY planning.{table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)", tampon
+                )
+                if "id" in df.columns:
+                    cur.execute(
+                        "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)",
+                        (f"planning.{table}", max(int(df["id"].max()), 1) if len(df) else 1)
+                    )
+    invalider_tables(TABLES_VIDEES)
+
+
+def resume(donnees):
+    """Nombre de lignes par table."""
+    return {table: len(df) for table, df in donnees.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère et charge un jeu de données synthétique")
+    parser.add_argument("--taille", choices=TAILLES, default="faculte")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--etudiants", type=int, help="remplace le nombre d'étudiants de la taille choisie")
+    args = parser.parse_args()
+
+    tailles = dict(TAILLES[args.taille])
+    if args.etudiants:
+        tailles["etudiants"] = args.etudiants
+    donnees = generer(tailles, args.graine)
+    charger(donnees)
+    for table, n in resume(donnees).items():
+        print(f"{table:16} {n:>8}")
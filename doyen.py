@@ -1,23 +1,21 @@
+import tempfile
 import streamlit as st
 import pandas as pd
-from db import get_connection
+from catalogue import SQL
+from db import lire_sql, lire_plusieurs
+from export import EXPORTS, FORMATS, apercu
+from indicateurs import charger_plan
+from mesures import definir_page
 
-# =====================================
-# UTILITAIRE : vérifier si une vue existe
-# =====================================
-def vue_existe(conn, schema, vue):
-    q = """
-    SELECT 1
-    FROM information_schema.views
-    WHERE table_schema = %s AND table_name = %s
-    """
-    df = pd.read_sql(q, conn, params=(schema, vue))
-    return not df.empty
+# Au-delà, le téléchargement passerait tout entier par la mémoire de Streamlit :
+# l'export se fait en ligne de commande (python export.py ...)
+TAILLE_MAX_TELECHARGEMENT = 100 * 1024 * 1024
 
 # =====================================
 # INTERFACE DOYEN / VICE-DOYEN
 # =====================================
 def interface_doyen(user):
+    definir_page("doyen")
 
     # ---------- CSS professionnel ----------
     st.markdown("""
@@ -78,7 +76,6 @@ def interface_doyen(user):
             st.rerun()
 
     st.title("Plateforme d’Optimisation des Examens")
-    conn = get_connection()
 
     # =======================
     # TABLEAU DE BORD
@@ -87,38 +84,23 @@ def interface_doyen(user):
 
         c1, c2, c3, c4 = st.columns(4)
 
-        exams_count = pd.read_sql("SELECT COUNT(*) FROM planning.examens", conn).iloc[0,0]
-        students_count = pd.read_sql("SELECT COUNT(*) FROM planning.etudiants", conn).iloc[0,0]
-        rooms_count = pd.read_sql("SELECT COUNT(*) FROM planning.lieu_examen", conn).iloc[0,0]
-        professors_count = pd.read_sql("SELECT COUNT(*) FROM planning.professeurs", conn).iloc[0,0]
-
-        c1.metric("Examens", exams_count)
-        c2.metric("Étudiants", students_count)
-        c3.metric("Salles", rooms_count)
-        c4.metric("Professeurs", professors_count)
+        # Panneaux indépendants : requêtes lancées ensemble
+        donnees = lire_plusieurs({
+            # Indicateurs servis par les vues matérialisées (voir bdd1)
+            "kpi": SQL["doyen.indicateurs"],
+            "salles": SQL["doyen.occupation_salles"],
+            # Chevauchements réels salle / professeur / formation (index GiST)
+            "conflits": (SQL["conflits.rapport"], {"dept_id": None}),
+        })
+        kpi = donnees["kpi"].iloc[0]
+
+        c1.metric("Examens", kpi["nb_examens"])
+        c2.metric("Étudiants", kpi["nb_etudiants"])
+        c3.metric("Salles", kpi["nb_salles"])
+        c4.metric("Professeurs", kpi["nb_professeurs"])
 
         st.subheader("Occupation des salles / Amphis")
-        if not vue_existe(conn, "planning", "v_occupation_salles"):
-            st.warning("La vue v_occupation_salles n’existe pas encore. Création automatique...")
-            cur = conn.cursor()
-            cur.execute("""
-                CREATE OR REPLACE VIEW planning.v_occupation_salles AS
-                SELECT 
-                    l.id AS salle_id,
-                    l.nom AS salle_nom,
-                    COALESCE(COUNT(i.etudiant_id),0) AS nb_inscrits,
-                    l.capacite,
-                    ROUND(COALESCE(COUNT(i.etudiant_id),0)::numeric / NULLIF(l.capacite,0) * 100, 2) AS taux_occupation
-                FROM planning.lieu_examen l
-                LEFT JOIN planning.examens e ON e.salle_id = l.id
-                LEFT JOIN planning.inscriptions i ON i.examen_id = e.id
-                GROUP BY l.id, l.nom, l.capacite
-                ORDER BY l.nom;
-            """)
-            conn.commit()
-            st.success("Vue v_occupation_salles créée avec succès !")
-
-        df_salles = pd.read_sql("SELECT * FROM planning.v_occupation_salles", conn)
+        df_salles = donnees["salles"]
 
         # Coloration simple
         def color_row(row):
@@ -133,12 +115,7 @@ def interface_doyen(user):
         st.bar_chart(df_salles.set_index('salle_nom')['taux_occupation'])
 
         st.subheader("Conflits détectés")
-        df_conflicts = pd.read_sql("""
-            SELECT e1.id AS exam1, e2.id AS exam2, e1.date_heure AS date_heure, l.nom AS salle
-            FROM planning.examens e1
-            JOIN planning.examens e2 ON e1.id < e2.id AND e1.date_heure = e2.date_heure
-            JOIN planning.lieu_examen l ON e1.salle_id = l.id AND e1.salle_id = e2.salle_id
-        """, conn)
+        df_conflicts = donnees["conflits"]
         if df_conflicts.empty:
             st.success("Aucun conflit détecté")
         else:
@@ -150,17 +127,7 @@ def interface_doyen(user):
     # =======================
     elif menu == "Emplois du temps":
         st.subheader("Emplois du temps des examens")
-        df = pd.read_sql("""
-            SELECT e.id AS exam_id,
-                   m.nom AS module,
-                   l.nom AS salle,
-                   e.date_heure,
-                   e.duree_minutes
-            FROM planning.examens e
-            JOIN planning.modules m ON e.module_id = m.id
-            JOIN planning.lieu_examen l ON e.salle_id = l.id
-            ORDER BY e.date_heure
-        """, conn)
+        df = lire_sql(SQL["doyen.emplois_du_temps"])
         st.dataframe(df, use_container_width=True)
         if st.button("Valider définitivement l’EDT"):
             st.success("Emploi du temps validé avec succès !")
@@ -169,61 +136,95 @@ def interface_doyen(user):
     # INDICATEURS
     # =======================
     elif menu == "Indicateurs":
+        # Planning chargé une fois en tableaux NumPy, mesures vectorisées
+        plan = charger_plan()
+        df_dep = plan.utilisation_departements().set_index("departement")
+
+        st.subheader("Qualité du planning")
+        st.dataframe(
+            pd.Series(plan.resume(), name="Valeur").astype(str).to_frame(),
+            use_container_width=True
+        )
+
         st.subheader("Nombre d'examens par département")
-        df = pd.read_sql("""
-            SELECT d.nom AS departement,
-                   COUNT(e.id) AS nb_examens
-            FROM planning.departements d
-            LEFT JOIN planning.formations f ON f.dept_id = d.id
-            LEFT JOIN planning.modules m ON m.formation_id = f.id
-            LEFT JOIN planning.examens e ON e.module_id = m.id
-            GROUP BY d.nom
-        """, conn)
-        st.bar_chart(df.set_index("departement"))
+        st.bar_chart(df_dep["nb_examens"])
 
         st.subheader("Taux d'utilisation des salles par département")
-        df_salles_dep = pd.read_sql("""
-            SELECT d.nom AS departement,
-                   ROUND(AVG(occup.nb_etudiants::numeric / NULLIF(occup.capacite,0) * 100),2) AS taux_utilisation
-            FROM planning.departements d
-            LEFT JOIN planning.formations f ON f.dept_id = d.id
-            LEFT JOIN planning.modules m ON m.formation_id = f.id
-            LEFT JOIN planning.examens e ON e.module_id = m.id
-            LEFT JOIN planning.lieu_examen l ON e.salle_id = l.id
-            LEFT JOIN (
-                SELECT e.salle_id, COUNT(i.etudiant_id) AS nb_etudiants, l.capacite
-                FROM planning.examens e
-                LEFT JOIN planning.inscriptions i ON i.examen_id = e.id
-                LEFT JOIN planning.lieu_examen l ON e.salle_id = l.id
-                GROUP BY e.salle_id, l.capacite
-            ) AS occup ON occup.salle_id = l.id
-            GROUP BY d.nom
-            ORDER BY d.nom
-        """, conn)
-        st.bar_chart(df_salles_dep.set_index("departement"))
+        st.bar_chart(df_dep["taux_utilisation"])
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Écart minimal entre deux examens (jours)")
+            st.bar_chart(pd.Series(plan.ecart_minimal()).value_counts().sort_index())
+        with col2:
+            st.subheader("Remplissage des salles (%)")
+            tranches = pd.cut(plan.remplissage() * 100, bins=range(0, 101, 10), include_lowest=True)
+            st.bar_chart(pd.Series(tranches).value_counts().sort_index().rename(str))
+
+        st.subheader("Charge des professeurs par jour")
+        st.bar_chart(pd.Series(plan.charge_prof_jour()).value_counts().sort_index())
 
     # =======================
     # RAPPORTS
     # =======================
     elif menu == "Rapports":
         st.subheader("Export des examens")
-        df = pd.read_sql("""
-            SELECT m.nom AS module,
-                   l.nom AS salle,
-                   e.date_heure,
-                   p.nom AS professeur
-            FROM planning.examens e
-            JOIN planning.modules m ON e.module_id = m.id
-            JOIN planning.lieu_examen l ON e.salle_id = l.id
-            JOIN planning.professeurs p ON e.prof_id = p.id
-        """, conn)
-        st.dataframe(df, use_container_width=True)
-        csv = df.to_csv(index=False).encode("utf-8")
-        st.download_button(
-            "Exporter en CSV",
-            csv,
-            "examens_valides.csv",
-            "text/csv"
-        )
 
-    conn.close()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            export = st.selectbox(
+                "Contenu",
+                list(EXPORTS),
+                format_func=lambda e: {"examens": "Examens", "convocations": "Convocations par étudiant"}[e]
+            )
+        with col2:
+            portee = st.selectbox("Portée", ["Faculté", "Département", "Formation", "Promotion"])
+        with col3:
+            format_export = st.selectbox("Format", list(FORMATS), format_func=str.upper)
+
+        filtres = {}
+        if portee in ("Département", "Formation"):
+            df_dept = lire_sql(SQL["commun.departements"])
+            dept = st.selectbox("Département", df_dept["nom"].tolist())
+            filtres["dept_id"] = int(df_dept.loc[df_dept["nom"] == dept, "id"].iloc[0])
+        if portee == "Formation":
+            df_form = lire_sql(SQL["commun.formations_departement"], (filtres["dept_id"],))
+            if not df_form.empty:
+                formation = st.selectbox("Formation", df_form["nom"].tolist())
+                filtres["formation_id"] = int(df_form.loc[df_form["nom"] == formation, "id"].iloc[0])
+        if portee == "Promotion":
+            df_promo = lire_sql(SQL["doyen.promos"])
+            filtres["promo"] = st.selectbox("Promotion", df_promo["promo"].tolist())
+
+        st.dataframe(apercu(export, **filtres), use_container_width=True)
+
+        options = "".join(
+            f" --{option} {valeur}" for option, valeur in
+            (("dept", filtres.get("dept_id")), ("formation", filtres.get("formation_id")), ("promo", filtres.get("promo")))
+            if valeur is not None
+        )
+        commande = f"python export.py {export} {export}.{format_export} --format {format_export}{options}"
+
+        if st.button("Préparer l'export"):
+            # Écrit en flux dans un fichier temporaire (passe sur disque au-delà de 8 Mo),
+            # fermé dès que son contenu a été remis au bouton de téléchargement
+            with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as fichier:
+                with st.spinner("Export en cours..."):
+                    FORMATS[format_export](fichier, export, **filtres)
+                taille = fichier.tell()
+                contenu = None
+                if taille <= TAILLE_MAX_TELECHARGEMENT:
+                    fichier.seek(0)
+                    contenu = fichier.read()
+            if contenu is None:
+                st.warning(f"Export trop volumineux ({taille // (1024 * 1024)} Mo) pour le navigateur : "
+                           "le lancer en ligne de commande")
+                st.code(commande)
+            else:
+                st.download_button(
+                    f"Télécharger ({format_export.upper()})",
+                    contenu,
+                    f"{export}.{format_export}",
+                    "text/csv" if format_export == "csv" else "application/vnd.apache.parquet"
+                )
+        st.caption(f"Gros exports : `{commande}`")
@@ -0,0 +1,187 @@
+# ecriture.py - Écriture groupée des plans d'examens (une seule transaction)
+import pandas as pd
+import psycopg2
+from psycopg2.extras import execute_values
+from cache import invalider_tables
+
+INSERT_EXAMENS = """
+    INSERT INTO planning.examens
+    (module_id, prof_id, salle_id, periode_id, date_heure, duree_minutes)
+    VALUES %s
+"""
+
+# periode_id : None pour les créneaux par défaut (aucune période définie)
+COLONNES = ("module_id", "prof_id", "salle_id", "periode_id", "date_heure", "duree_minutes")
+
+# Contraintes d'exclusion (bdd1) -> type de conflit affiché
+CONFLITS_CONTRAINTES = {
+    "excl_examens_salle": "Salle surchargée",
+    "excl_examens_prof": "Conflit professeur",
+}
+EXCLUSION_VIOLATION = "23P01"
+
+# Contraintes des tables de comptage (bdd1) -> message de refus
+MESSAGES_CONTRAINTES = {
+    "ck_etudiant_un_exam_jour": "Conflit: étudiant déjà un examen ce jour",
+    "ck_prof_max3_jour": "Conflit: professeur déjà 3 examens ce jour",
+}
+
+
+def _ligne(exam):
+    return tuple(exam[c] for c in COLONNES)
+
+
+def raison_refus(erreur):
+    """Message lisible d'une erreur PostgreSQL (trigger, contrainte...)."""
+    diag = getattr(erreur, "diag", None)
+    if diag is not None and diag.constraint_name in MESSAGES_CONTRAINTES:
+        return MESSAGES_CONTRAINTES[diag.constraint_name]
+    if diag is not None and diag.message_primary:
+        return diag.message_primary
+    return str(erreur).strip()
+
+
+def type_refus(erreur):
+    """Type de conflit si la ligne viole une contrainte d'exclusion, sinon None."""
+    if getattr(erreur, "pgcode", None) != EXCLUSION_VIOLATION:
+        return None
+    return CONFLITS_CONTRAINTES.get(erreur.diag.constraint_name, "Chevauchement")
+
+
+def _unites(plan):
+    """Lignes du plan regroupées par (module_id, date_heure), dans l'ordre du plan.
+
+    Un module réparti sur plusieurs salles n'est valide qu'entier : la
+    vérification de capacité de bdd1 somme les salles du module sur le jour."""
+    unites = {}
+    for exam in plan:
+        unites.setdefault((exam["module_id"], exam["date_heure"]), []).append(exam)
+    return list(unites.values())
+
+
+def _lots(unites, taille_lot):
+    """Lots d'environ taille_lot lignes, sans jamais couper une unité entre deux lots."""
+    lot = []
+    for unite in unites:
+        if lot and len(lot) + len(unite) > taille_lot:
+            yield lot
+            lot = []
+        lot += unite
+    if lot:
+        yield lot
+
+
+def inserer_examens(conn, plan, taille_lot=1000):
+    """Insère tout un plan d'examens en une transaction et un seul commit.
+
+    Chemin rapide : INSERT multi-lignes par lots, chaque lot ne contenant que
+    des modules entiers (toutes leurs salles dans la même instruction).
+    Si un trigger refuse une ligne, on revient au point de sauvegarde et on
+    rejoue module par module (unité : module_id, date_heure) sous SAVEPOINT
+    pour collecter la raison de chaque refus sans annuler le reste du lot ;
+    un module est gardé ou rejeté avec toutes ses salles.
+    Renvoie (insérés, rejets)."""
+    if not plan:
+        return [], []
+
+    unites = _unites(plan)
+    cur = conn.cursor()
+    try:
+        cur.execute("SAVEPOINT lot_examens")
+        try:
+            for lot in _lots(unites, taille_lot):
+                execute_values(cur, INSERT_EXAMENS, [_ligne(e) for e in lot], page_size=len(lot))
+            cur.execute("RELEASE SAVEPOINT lot_examens")
+            conn.commit()
+            invalider_tables({"examens"})
+            return list(plan), []
+        except psycopg2.Error:
+            cur.execute("ROLLBACK TO SAVEPOINT lot_examens")
+
+        # Repli module par module, toujours dans la même transaction
+        inseres, rejets = [], []
+        for unite in unites:
+            cur.execute("SAVEPOINT unite_examen")
+            try:
+                execute_values(cur, INSERT_EXAMENS, [_ligne(e) for e in unite], page_size=len(unite))
+                cur.execute("RELEASE SAVEPOINT unite_examen")
+                inseres += unite
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT unite_examen")
+                rejets += [{**exam, "Raison": raison_refus(e), "Type": type_refus(e)} for exam in unite]
+        conn.commit()
+        invalider_tables({"examens"})
+        return inseres, rejets
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def remplacer_surveillances(conn, examen_ids, affectations, taille_lot=1000):
+    """Remplace les surveillances des examens donnés en une transaction.
+
+    Les compteurs total_surveillance sont tenus à jour par le trigger
+    d'instruction de bdd1 (décrément des anciennes, incrément des nouvelles)."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "DELETE FROM planning.surveillances WHERE examen_id = ANY(%s)",
+            (list(examen_ids),)
+        )
+        execute_values(
+            cur,
+            "INSERT INTO planning.surveillances (examen_id, prof_id, priorite_dept) VALUES %s",
+            [(a["examen_id"], a["prof_id"], a["priorite_dept"]) for a in affectations],
+            page_size=taille_lot
+        )
+        conn.commit()
+        invalider_tables({"surveillances", "professeurs"})
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def appliquer_optimisation(conn, optimisation, taille_lot=1000):
+    """Écrit les nouvelles salles / professeurs / horaires des examens placés
+    en une transaction.
+
+    Les contraintes d'exclusion sont vérifiées en fin de transaction : deux
+    examens peuvent échanger leurs salles sans état intermédiaire refusé.
+    La période n'est changée que si l'horaire change (periode_id facultatif).
+    Un examen sans professeur (prof_id NULL) le reste."""
+    lignes = [
+        (
+            int(e["examen_id"]), int(e["salle_id"]),
+            None if pd.isna(e["prof_id"]) else int(e["prof_id"]),
+            e["date_heure"], e.get("periode_id")
+        )
+        for e in optimisation if e["salle_id"] is not None
+    ]
+    if not lignes:
+        return 0
+
+    cur = conn.cursor()
+    try:
+        cur.execute("SET CONSTRAINTS planning.excl_examens_salle, planning.excl_examens_prof DEFERRED")
+        execute_values(cur, """
+            UPDATE planning.examens e
+            SET salle_id = v.salle_id,
+                prof_id = v.prof_id::int,
+                periode_id = CASE WHEN e.date_heure = v.date_heure THEN e.periode_id
+                                  ELSE v.periode_id::int END,
+                date_heure = v.date_heure
+            FROM (VALUES %s) AS v(id, salle_id, prof_id, date_heure, periode_id)
+            WHERE e.id = v.id
+        """, lignes, page_size=taille_lot)
+        conn.commit()
+        invalider_tables({"examens"})
+        return len(lignes)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
@@ -0,0 +1,118 @@
+# export.py - Exports CSV / Parquet en flux (mémoire bornée)
+#
+# En ligne de commande : python export.py convocations sortie.csv --dept 2
+import argparse
+from db import connexion, lire_sql
+
+TAILLE_LOT = 10000   # lignes lues par aller-retour (curseur serveur, Parquet)
+
+# Portée : %(dept_id)s, %(formation_id)s, %(promo)s ; NULL = pas de filtre
+EXPORTS = {
+    "examens": """
+        SELECT m.nom AS module, f.nom AS formation, d.nom AS departement,
+               l.nom AS salle, e.date_heure, e.duree_minutes, p.nom AS professeur
+        FROM planning.examens e
+        JOIN planning.modules m ON e.module_id = m.id
+        JOIN planning.formations f ON m.formation_id = f.id
+        JOIN planning.departements d ON f.dept_id = d.id
+        JOIN planning.lieu_examen l ON e.salle_id = l.id
+        JOIN planning.professeurs p ON e.prof_id = p.id
+        WHERE (%(dept_id)s::int IS NULL OR f.dept_id = %(dept_id)s::int)
+          AND (%(formation_id)s::int IS NULL OR f.id = %(formation_id)s::int)
+          AND (%(promo)s::varchar IS NULL OR EXISTS (
+                SELECT 1 FROM planning.inscriptions i
+                JOIN planning.etudiants et ON et.id = i.etudiant_id
+                WHERE i.module_id = e.module_id AND et.promo = %(promo)s::varchar))
+        ORDER BY e.date_heure, l.nom
+    """,
+    # Une ligne par étudiant et examen (salles d'un module réparti regroupées)
+    "convocations": """
+        SELECT et.id AS etudiant_id, et.nom, et.prenom, et.promo, f.nom AS formation,
+               m.nom AS module, e.date_heure, e.duree_minutes,
+               string_agg(l.nom, ', ' ORDER BY l.nom) AS salles
+        FROM planning.inscriptions i
+        JOIN planning.etudiants et ON et.id = i.etudiant_id
+        JOIN planning.formations f ON f.id = et.formation_id
+        JOIN planning.modules m ON m.id = i.module_id
+        JOIN planning.examens e ON e.module_id = i.module_id
+        JOIN planning.lieu_examen l ON l.id = e.salle_id
+        WHERE (%(dept_id)s::int IS NULL OR f.dept_id = %(dept_id)s::int)
+          AND (%(formation_id)s::int IS NULL OR f.id = %(formation_id)s::int)
+          AND (%(promo)s::varchar IS NULL OR et.promo = %(promo)s::varchar)
+        GROUP BY et.id, et.nom, et.prenom, et.promo, f.nom, m.nom, e.date_heure, e.duree_minutes
+        ORDER BY et.id, e.date_heure
+    """,
+}
+
+# Type PostgreSQL (oid) -> type Arrow ; texte par défaut
+TYPES_ARROW = {
+    16: "bool_", 20: "int64", 21: "int16", 23: "int32",
+    700: "float32", 701: "float64",
+    1082: "date32", 1114: "timestamp",
+}
+
+
+def _portee(dept_id=None, formation_id=None, promo=None):
+    return {"dept_id": dept_id, "formation_id": formation_id, "promo": promo}
+
+
+def exporter_csv(sortie, export="examens", **portee):
+    """COPY (requête) TO STDOUT : les lignes vont du serveur au fichier sans
+    passer par un DataFrame. sortie : fichier ouvert (texte ou binaire)."""
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            requete = cur.mogrify(EXPORTS[export], _portee(**portee)).decode()
+            cur.copy_expert(f"COPY ({requete}) TO STDOUT WITH (FORMAT csv, HEADER)", sortie)
+
+
+def exporter_parquet(sortie, export="examens", **portee):
+    """Curseur serveur lu par lots de TAILLE_LOT, un groupe de lignes Parquet par lot."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("L'export Parquet nécessite pyarrow (pip install pyarrow)")
+
+    def type_arrow(oid):
+        nom = TYPES_ARROW.get(oid)
+        if nom == "timestamp":
+            return pa.timestamp("us")
+        return getattr(pa, nom)() if nom else pa.string()
+
+    with connexion() as conn:
+        with conn.cursor(name="export_parquet") as cur:
+            cur.itersize = TAILLE_LOT
+            cur.execute(EXPORTS[export], _portee(**portee))
+            lignes = cur.fetchmany(TAILLE_LOT)
+            schema = pa.schema([(c.name, type_arrow(c.type_code)) for c in cur.description])
+            with pq.ParquetWriter(sortie, schema) as ecrivain:
+                while lignes:
+                    colonnes = list(zip(*lignes))
+                    ecrivain.write_batch(pa.record_batch(
+                        [pa.array(v, type=t) for v, t in zip(colonnes, schema.types)], schema=schema
+                    ))
+                    lignes = cur.fetchmany(TAILLE_LOT)
+
+
+FORMATS = {"csv": exporter_csv, "parquet": exporter_parquet}
+
+
+def apercu(export="examens", limite=100, **portee):
+    """Premières lignes d'un export, pour affichage."""
+    return lire_sql(
+        f"SELECT * FROM ({EXPORTS[export]}) x LIMIT %(limite)s",
+        {**_portee(**portee), "limite": limite}
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export en flux des examens / convocations")
+    parser.add_argument("export", choices=EXPORTS)
+    parser.add_argument("fichier")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--dept", type=int)
+    parser.add_argument("--formation", type=int)
+    parser.add_argument("--promo")
+    args = parser.parse_args()
+    with open(args.fichier, "wb") as sortie:
+        FORMATS[args.format](sortie, args.export, dept_id=args.dept, formation_id=args.formation, promo=args.promo)
@@ -0,0 +1,399 @@
+# generation.py - Génération d'EDT par coloration de graphe (DSATUR)
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+import pandas as pd
+from catalogue import SQL
+from conflits import IndexConflits
+from db import connexion, lire_sql
+from ecriture import inserer_examens
+from occupation import IndexOccupation
+from salles import AllocateurSalles
+
+MAX_EXAMENS_PROF_JOUR = 3
+DUREE_EXAMEN = 120  # en minutes
+HEURES_CRENEAUX = [8, 10, 12, 14, 16]
+
+
+def creneaux_periodes(df_periodes):
+    """Créneaux à partir des lignes de planning.periodes_examen."""
+    creneaux = []
+    for p in df_periodes.to_dict("records"):
+        creneaux.append({
+            "periode_id": int(p["id"]),
+            "jour": p["date"],
+            "debut": datetime.combine(p["date"], p["heure_debut"]),
+            "fin": datetime.combine(p["date"], p["heure_fin"])
+        })
+    return sorted(creneaux, key=lambda c: c["debut"])
+
+
+def creneaux_par_defaut(date_debut, date_fin):
+    """Créneaux de 2h entre 8h et 18h quand aucune période n'est définie."""
+    creneaux = []
+    for j in range((date_fin - date_debut).days + 1):
+        jour = date_debut + timedelta(days=j)
+        for h in HEURES_CRENEAUX:
+            debut = datetime.combine(jour, datetime.min.time()) + timedelta(hours=h)
+            creneaux.append({
+                "periode_id": None,
+                "jour": jour,
+                "debut": debut,
+                "fin": debut + timedelta(minutes=DUREE_EXAMEN)
+            })
+    return creneaux
+
+
+def fin_examen(examen):
+    """Fin d'un examen déjà en base ; durée NULL : DUREE_EXAMEN (comme la plage de bdd1)."""
+    duree = examen["duree_minutes"]
+    return examen["date_heure"] + timedelta(minutes=DUREE_EXAMEN if pd.isna(duree) else int(duree))
+
+
+def duree_creneau(creneau):
+    """Durée en minutes d'un créneau (heure_debut / heure_fin de sa période)."""
+    return int((creneau["fin"] - creneau["debut"]).total_seconds() // 60)
+
+
+def generer_planning(df_modules, df_inscriptions, creneaux, df_salles, df_profs, df_existants=None,
+                     progression=None, df_jours_etudiants=None):
+    """Place chaque module sur un créneau en une seule passe.
+
+    Coloration DSATUR du graphe des conflits (modules partageant un étudiant) :
+    deux modules voisins ne tombent jamais le même jour. Les règles professeur
+    (3 examens / jour) et capacité des salles sont vérifiées avant toute écriture.
+
+    df_modules : id, nom
+    df_inscriptions : etudiant_id, module_id
+    df_salles : id, nom, capacite, batiment
+    df_profs : id, nom
+    df_existants : prof_id, salle_id, date_heure, duree_minutes (examens déjà en base)
+    progression : fonction(pourcentage) appelée au fil du placement
+    df_jours_etudiants : etudiant_id, jour (jours où l'étudiant a déjà un examen)
+    Renvoie (plan, rejets)."""
+    index = IndexConflits(df_inscriptions, cle="module_id")
+    profs = df_profs["id"].tolist()
+
+    # Occupation des salles / professeurs et charge des professeurs par jour
+    allocateur = AllocateurSalles(df_salles)
+    occupation_profs = IndexOccupation()
+    charge_jour = {}
+    charge_totale = {p: 0 for p in profs}
+
+    if df_existants is not None:
+        for e in df_existants.to_dict("records"):
+            debut, fin = e["date_heure"], fin_examen(e)
+            allocateur.occupation.ajouter(e["salle_id"], debut, fin)
+            occupation_profs.ajouter(e["prof_id"], debut, fin)
+            cle = (e["prof_id"], debut.date())
+            charge_jour[cle] = charge_jour.get(cle, 0) + 1
+
+    modules = dict(zip(df_modules["id"], df_modules["nom"]))
+    voisins = {m: [v for v in index.voisins(m) if v in modules] for m in modules}
+    jours_interdits = {m: set() for m in modules}
+    # Jours déjà pris par les examens en base des inscrits de chaque module
+    if df_jours_etudiants is not None and not df_jours_etudiants.empty:
+        pris = df_inscriptions[["etudiant_id", "module_id"]].merge(df_jours_etudiants, on="etudiant_id")
+        for m, jour in pris[["module_id", "jour"]].drop_duplicates().itertuples(index=False):
+            if m in jours_interdits:
+                jours_interdits[m].add(jour)
+    restants = set(modules)
+    plan, rejets = [], []
+
+    while restants:
+        if progression:
+            progression(int((len(modules) - len(restants)) / len(modules) * 100))
+        # Module le plus saturé d'abord, puis le plus contraint (degré)
+        m = max(restants, key=lambda x: (len(jours_interdits[x]), len(voisins[x]), -x))
+        restants.remove(m)
+        effectif = index.effectif(m)
+        affectation = None
+        raison = "Aucun créneau sans conflit étudiant"
+
+        for c in creneaux:
+            if c["jour"] in jours_interdits[m]:
+                continue
+
+            libres = [p for p in profs
+                      if charge_jour.get((p, c["jour"]), 0) < MAX_EXAMENS_PROF_JOUR
+                      and occupation_profs.est_libre(p, c["debut"], c["fin"])]
+            if not libres:
+                raison = "Aucun professeur disponible"
+                continue
+
+            # Salle au plus juste, ou plusieurs salles d'un même bâtiment
+            repartition = allocateur.allouer(effectif, c["debut"], c["fin"])
+            if not repartition:
+                raison = "Aucune salle de capacité suffisante"
+                continue
+            if len(libres) < len(repartition):
+                raison = "Pas assez de professeurs pour les salles"
+                continue
+
+            # Un professeur par salle, les moins chargés d'abord
+            choisis = sorted(libres, key=lambda p: charge_totale[p])[:len(repartition)]
+            affectation = (c, list(zip(choisis, repartition)))
+            break
+
+        if affectation is None:
+            rejets.append({"Matiere": modules[m], "Raison": raison})
+            continue
+
+        c, salles_profs = affectation
+        allocateur.reserver([r for _, r in salles_profs], c["debut"], c["fin"], m)
+        for v in voisins[m]:
+            jours_interdits[v].add(c["jour"])
+
+        for prof, ((capacite, salle_id, salle_nom, _), places) in salles_profs:
+            occupation_profs.ajouter(prof, c["debut"], c["fin"], m)
+            charge_jour[(prof, c["jour"])] = charge_jour.get((prof, c["jour"]), 0) + 1
+            charge_totale[prof] += 1
+            plan.append({
+                "module_id": int(m),
+                "Matiere": modules[m],
+                "prof_id": int(prof),
+                "salle_id": int(salle_id),
+                "Salle": salle_nom,
+                "periode_id": c["periode_id"],
+                "date_heure": c["debut"],
+                "duree_minutes": duree_creneau(c),
+                "nb_inscrits": places
+            })
+
+    plan.sort(key=lambda e: (e["date_heure"], e["Salle"]))
+    return plan, rejets
+
+
+# ============================================
+# GÉNÉRATION COMPLÈTE D'UNE FORMATION
+# ============================================
+
+def charger_formation(formation_id, dept_id, date_debut, date_fin):
+    """Données nécessaires à la génération d'une formation sur une période."""
+    # Modules pas encore planifiés
+    modules = lire_sql(SQL["generation.modules_formation"], (formation_id,), cache=False)
+    inscriptions = lire_sql(SQL["generation.inscriptions_formation"], (formation_id,))
+    salles = lire_sql(SQL["commun.salles"])
+    profs = lire_sql(SQL["generation.profs_departement"], (dept_id,))
+    periodes = lire_sql(SQL["commun.periodes"], (date_debut, date_fin))
+    existants = lire_sql(SQL["commun.examens_existants"], (date_debut, date_fin), cache=False)
+    jours_etudiants = lire_sql(
+        SQL["generation.jours_etudiants_formation"], (formation_id, date_debut, date_fin), cache=False
+    )
+
+    if periodes.empty:
+        creneaux = creneaux_par_defaut(date_debut, date_fin)
+    else:
+        creneaux = creneaux_periodes(periodes)
+
+    return modules, inscriptions, creneaux, salles, profs, existants, jours_etudiants
+
+
+def compte_rendu(ecrits, rejets, refuses):
+    """Résultat affichable d'une génération : {inseres, rejets, conflits}."""
+    return {
+        "inseres": [
+            {"Matiere": e["Matiere"], "Salle": e["Salle"], "Date_Heure": e["date_heure"]}
+            for e in ecrits
+        ],
+        "rejets": rejets + [
+            {"Matiere": e["Matiere"], "Raison": e["Raison"]} for e in refuses
+        ],
+        # Chevauchements refusés par les contraintes d'exclusion
+        "conflits": [
+            {
+                "Type": e["Type"],
+                "Détails": f"{e['Matiere']} ({e['Salle']}) le {e['date_heure']} : {e['Raison']}"
+            }
+            for e in refuses if e.get("Type")
+        ],
+    }
+
+
+def generer_formation(formation_id, dept_id, date_debut, date_fin, progression=None):
+    """Charge, planifie puis écrit en une transaction l'EDT d'une formation.
+
+    Renvoie le compte rendu {inseres, rejets, conflits}."""
+    date_debut = date.fromisoformat(str(date_debut))
+    date_fin = date.fromisoformat(str(date_fin))
+    modules, inscriptions, creneaux, salles, profs, existants, jours_etudiants = charger_formation(
+        formation_id, dept_id, date_debut, date_fin
+    )
+    if modules.empty or salles.empty or profs.empty:
+        raise ValueError("Modules, salles ou professeurs manquants")
+
+    # Placement : 0-90 %, écriture : 90-100 %
+    suivi = (lambda p: progression(p * 9 // 10)) if progression else None
+    plan, rejets = generer_planning(
+        modules, inscriptions, creneaux, salles, profs, existants, suivi, jours_etudiants
+    )
+    if progression:
+        progression(90)
+
+    with connexion() as conn:
+        ecrits, refuses = inserer_examens(conn, plan)
+
+    return compte_rendu(ecrits, rejets, refuses)
+
+
+# ============================================
+# GÉNÉRATION DE TOUTE LA FACULTÉ (un processus par département)
+# ============================================
+
+def charger_faculte(date_debut, date_fin):
+    """Données de toute la faculté, découpées par département.
+
+    Un professeur n'appartient qu'à un département. Les modules suivis par
+    des étudiants inscrits dans plusieurs départements sont mis à part
+    (transversaux) : les autres ne partagent que les salles et peuvent être
+    planifiés en parallèle. Les modules d'un département sans professeur
+    sont rejetés d'office.
+
+    departements : {dept_id: (modules locaux, inscriptions, profs, jours, modules transversaux)}"""
+    modules = lire_sql(SQL["generation.modules_faculte"], cache=False)
+    inscriptions = lire_sql(SQL["generation.inscriptions_faculte"])
+    profs = lire_sql(SQL["generation.profs_faculte"])
+    salles = lire_sql(SQL["commun.salles"])
+    periodes = lire_sql(SQL["commun.periodes"], (date_debut, date_fin))
+    existants = lire_sql(SQL["commun.examens_existants"], (date_debut, date_fin), cache=False)
+    jours_etudiants = lire_sql(SQL["generation.jours_etudiants_faculte"], (date_debut, date_fin), cache=False)
+
+    if periodes.empty:
+        creneaux = creneaux_par_defaut(date_debut, date_fin)
+    else:
+        creneaux = creneaux_periodes(periodes)
+
+    nb_departements = inscriptions.groupby("etudiant_id")["dept_id"].nunique()
+    multi = nb_departements.index[nb_departements > 1]
+    transversaux = modules["id"].isin(inscriptions.loc[inscriptions["etudiant_id"].isin(multi), "module_id"])
+
+    departements, rejets = {}, []
+    for dept_id, df_modules in modules.groupby("dept_id"):
+        df_profs = profs[profs["dept_id"] == dept_id]
+        if df_profs.empty:
+            rejets += [{"Matiere": nom, "Raison": "Aucun professeur dans le département"}
+                       for nom in df_modules["nom"]]
+            continue
+        df_inscriptions = inscriptions.loc[inscriptions["dept_id"] == dept_id, ["etudiant_id", "module_id"]]
+        departements[int(dept_id)] = (
+            df_modules.loc[~transversaux[df_modules.index], ["id", "nom"]],
+            df_inscriptions,
+            df_profs[["id", "nom"]],
+            jours_etudiants[jours_etudiants["etudiant_id"].isin(df_inscriptions["etudiant_id"])],
+            df_modules.loc[transversaux[df_modules.index], ["id", "nom"]],
+        )
+    return departements, creneaux, salles, existants, rejets
+
+
+def reconcilier_salles(plans, df_salles, df_existants=None):
+    """Fusionne les plans des départements en réservant chaque salle une seule fois.
+
+    Chaque département a planifié comme s'il était seul dans les salles.
+    Les examens sont repris du plus gros au plus petit : si une de leurs
+    salles est déjà prise sur le créneau, on en cherche d'autres sur le même
+    créneau (les règles étudiant / professeur restent donc valides), sinon
+    l'examen est rejeté. Renvoie (plan, rejets)."""
+    allocateur = AllocateurSalles(df_salles)
+    if df_existants is not None:
+        for e in df_existants.to_dict("records"):
+            allocateur.occupation.ajouter(e["salle_id"], e["date_heure"], fin_examen(e))
+
+    # Lignes d'un même module (une par salle) regroupées
+    examens = {}
+    for plan in plans:
+        for ligne in plan:
+            examens.setdefault(ligne["module_id"], []).append(ligne)
+
+    fusion, a_replacer, rejets = [], [], []
+    for lignes in sorted(examens.values(), key=lambda l: -sum(e["nb_inscrits"] for e in l)):
+        debut = lignes[0]["date_heure"]
+        fin = debut + timedelta(minutes=lignes[0]["duree_minutes"])
+        if all(allocateur.occupation.est_libre(e["salle_id"], debut, fin) for e in lignes):
+            for e in lignes:
+                allocateur.occupation.ajouter(e["salle_id"], debut, fin, e["module_id"])
+            fusion += lignes
+        else:
+            a_replacer.append(lignes)
+
+    # Salle prise par un autre département : autres salles, même créneau, mêmes professeurs
+    for lignes in a_replacer:
+        debut = lignes[0]["date_heure"]
+        fin = debut + timedelta(minutes=lignes[0]["duree_minutes"])
+        repartition = allocateur.allouer(sum(e["nb_inscrits"] for e in lignes), debut, fin)
+        if not repartition or len(repartition) > len(lignes):
+            rejets.append({"Matiere": lignes[0]["Matiere"], "Raison": "Salles prises par un autre département"})
+            continue
+        allocateur.reserver(repartition, debut, fin, lignes[0]["module_id"])
+        for e, ((_, salle_id, salle_nom, _), places) in zip(lignes, repartition):
+            fusion.append({**e, "salle_id": int(salle_id), "Salle": salle_nom, "nb_inscrits": places})
+
+    fusion.sort(key=lambda e: (e["date_heure"], e["Salle"]))
+    return fusion, rejets
+
+
+def jours_du_plan(plan, df_inscriptions):
+    """(etudiant_id, jour) des étudiants inscrits aux modules d'un plan."""
+    places = pd.DataFrame(
+        {"module_id": [e["module_id"] for e in plan], "jour": [e["date_heure"].date() for e in plan]}
+    ).drop_duplicates()
+    return df_inscriptions[["etudiant_id", "module_id"]].merge(places, on="module_id")[["etudiant_id", "jour"]]
+
+
+def generer_faculte(date_debut, date_fin, progression=None, nb_processus=None):
+    """EDT de tous les départements : un département par processus, puis
+    réconciliation des salles, puis les modules transversaux (étudiants de
+    plusieurs départements) un département après l'autre, en voyant tout ce
+    qui est déjà placé ; écriture en une seule transaction.
+
+    Renvoie le compte rendu {inseres, rejets, conflits}."""
+    date_debut = date.fromisoformat(str(date_debut))
+    date_fin = date.fromisoformat(str(date_fin))
+    departements, creneaux, salles, existants, rejets = charger_faculte(date_debut, date_fin)
+    if not departements or salles.empty:
+        raise ValueError("Modules, salles ou professeurs manquants")
+
+    # Résolution : 0-80 %, réconciliation et transversaux : 80-90 %, écriture : 90-100 %
+    plans = []
+    contexte = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=nb_processus, mp_context=contexte) as executeur:
+        futures = [
+            executeur.submit(
+                generer_planning, modules, inscriptions, creneaux, salles, profs, existants, None, jours
+            )
+            for modules, inscriptions, profs, jours, _ in departements.values()
+        ]
+        try:
+            for n, future in enumerate(as_completed(futures), 1):
+                plan, refuses = future.result()
+                plans.append(plan)
+                rejets += refuses
+                if progression:
+                    progression(n * 80 // len(futures), f"{n}/{len(futures)} départements")
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    plan, refuses = reconcilier_salles(plans, salles, existants)
+    rejets += refuses
+
+    # Passe séquentielle : chaque département voit les salles, professeurs et
+    # jours d'examen des étudiants déjà pris par les départements précédents
+    toutes_inscriptions = pd.concat([d[1] for d in departements.values()]).drop_duplicates()
+    colonnes = ["prof_id", "salle_id", "date_heure", "duree_minutes"]
+    for _, inscriptions, profs, jours, transversaux in departements.values():
+        if transversaux.empty:
+            continue
+        deja = pd.concat([existants[colonnes], pd.DataFrame(plan, columns=colonnes)], ignore_index=True)
+        jours = pd.concat([jours, jours_du_plan(plan, toutes_inscriptions)], ignore_index=True)
+        plan_dept, refuses = generer_planning(transversaux, inscriptions, creneaux, salles, profs, deja, None, jours)
+        plan += plan_dept
+        rejets += refuses
+    plan.sort(key=lambda e: (e["date_heure"], e["Salle"]))
+    if progression:
+        progression(90, "Écriture")
+
+    with connexion() as conn:
+        ecrits, refuses = inserer_examens(conn, plan)
+
+    return compte_rendu(ecrits, rejets, refuses)
@@ -0,0 +1,352 @@
+# importation.py - Import en masse des étudiants, modules et inscriptions
+#
+# Les CSV passent par COPY dans les tables UNLOGGED stg_* (voir bdd1), sont
+# validés et dédoublonnés en SQL ensembliste, puis fusionnés dans le schéma
+# planning ; le tout dans une seule transaction (rien n'est écrit si une
+# étape échoue).
+#
+# En ligne de commande :
+#   python importation.py --etudiants e.csv --modules m.csv --inscriptions i.csv
+import argparse
+import csv
+import time
+from cache import invalider_tables
+from db import connexion
+from rafraichissement import rafraichir, vues_de
+
+# Fichier -> colonnes attendues dans le CSV (première ligne = en-tête, ignorée)
+COLONNES = {
+    "etudiants": ("id", "nom", "prenom", "formation_id", "promo"),
+    "modules": ("id", "nom", "credits", "formation_id", "pre_req_id"),
+    "inscriptions": ("etudiant_id", "module_id", "note"),
+}
+# Ordre de fusion : les inscriptions référencent étudiants et modules
+ORDRE = ("etudiants", "modules", "inscriptions")
+
+ENTIER = r"'^\s*\d{1,9}\s*$'"
+NOTE = r"'^\s*\d{1,2}([.,]\d{1,2})?\s*$'"
+
+# Tables dont le cache et l'instantané doivent être invalidés après import
+TABLES_MODIFIEES = {
+    "etudiants", "modules", "inscriptions",
+    "compteur_module", "compteur_etudiant_jour",
+}
+
+# =====================================
+# VALIDATION (une instruction par règle, dans l'ordre)
+# =====================================
+VALIDATION = {
+    "etudiants": [
+        f"""
+        UPDATE planning.stg_etudiants s SET raison = CASE
+            WHEN s.id IS NULL OR s.id !~ {ENTIER} THEN 'id invalide'
+            WHEN COALESCE(trim(s.nom), '') = '' THEN 'nom manquant'
+            -- Longueurs des colonnes de planning.etudiants (bdd1)
+            WHEN length(trim(s.nom)) > 100 THEN 'nom trop long (100 caractères max)'
+            WHEN length(trim(s.prenom)) > 100 THEN 'prénom trop long (100 caractères max)'
+            WHEN length(trim(s.promo)) > 50 THEN 'promo trop longue (50 caractères max)'
+            WHEN s.formation_id IS NOT NULL AND s.formation_id !~ {ENTIER} THEN 'formation_id invalide'
+            WHEN s.formation_id IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM planning.formations f WHERE f.id = s.formation_id::int
+            ) THEN 'formation inconnue'
+        END
+        """,
+        # Même id plusieurs fois : la dernière ligne l'emporte
+        """
+        UPDATE planning.stg_etudiants s SET raison = 'doublon (ligne ' || d.derniere + 1 || ' gardée)'
+        FROM (
+            SELECT id::int AS id, MAX(ligne) AS derniere
+            FROM planning.stg_etudiants WHERE raison IS NULL
+            GROUP BY id::int HAVING COUNT(*) > 1
+        ) d
+        WHERE s.raison IS NULL AND s.id::int = d.id AND s.ligne < d.derniere
+        """,
+    ],
+    "modules": [
+        f"""
+        UPDATE planning.stg_modules s SET raison = CASE
+            WHEN s.id IS NULL OR s.id !~ {ENTIER} THEN 'id invalide'
+            WHEN COALESCE(trim(s.nom), '') = '' THEN 'nom manquant'
+            WHEN length(trim(s.nom)) > 120 THEN 'nom trop long (120 caractères max)'
+            WHEN s.credits IS NOT NULL AND s.credits !~ {ENTIER} THEN 'crédits invalides'
+            WHEN s.formation_id IS NOT NULL AND s.formation_id !~ {ENTIER} THEN 'formation_id invalide'
+            WHEN s.pre_req_id IS NOT NULL AND s.pre_req_id !~ {ENTIER} THEN 'pre_req_id invalide'
+            WHEN s.formation_id IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM planning.formations f WHERE f.id = s.formation_id::int
+            ) THEN 'formation inconnue'
+        END
+        """,
+        """
+        UPDATE planning.stg_modules s SET raison = 'doublon (ligne ' || d.derniere + 1 || ' gardée)'
+        FROM (
+            SELECT id::int AS id, MAX(ligne) AS derniere
+            FROM planning.stg_modules WHERE raison IS NULL
+            GROUP BY id::int HAVING COUNT(*) > 1
+        ) d
+        WHERE s.raison IS NULL AND s.id::int = d.id AND s.ligne < d.derniere
+        """,
+    ],
+    "inscriptions": [
+        f"""
+        UPDATE planning.stg_inscriptions s SET raison = CASE
+            WHEN s.etudiant_id IS NULL OR s.etudiant_id !~ {ENTIER} THEN 'etudiant_id invalide'
+            WHEN s.module_id IS NULL OR s.module_id !~ {ENTIER} THEN 'module_id invalide'
+            WHEN s.note IS NOT NULL AND s.note !~ {NOTE} THEN 'note invalide'
+            WHEN NOT EXISTS (
+                SELECT 1 FROM planning.etudiants e WHERE e.id = s.etudiant_id::int
+            ) THEN 'étudiant inconnu'
+            WHEN NOT EXISTS (
+                SELECT 1 FROM planning.modules m WHERE m.id = s.module_id::int
+            ) THEN 'module inconnu'
+        END
+        """,
+        """
+        UPDATE planning.stg_inscriptions s SET raison = 'doublon (ligne ' || d.derniere + 1 || ' gardée)'
+        FROM (
+            SELECT etudiant_id::int AS etudiant_id, module_id::int AS module_id, MAX(ligne) AS derniere
+            FROM planning.stg_inscriptions WHERE raison IS NULL
+            GROUP BY etudiant_id::int, module_id::int HAVING COUNT(*) > 1
+        ) d
+        WHERE s.raison IS NULL AND s.etudiant_id::int = d.etudiant_id
+          AND s.module_id::int = d.module_id AND s.ligne < d.derniere
+        """,
+        # Nouvelle inscription à un module déjà planifié : l'étudiant ne doit
+        # pas avoir d'autre examen ce jour-là (compteur_etudiant_jour, ou une
+        # autre ligne du même import)
+        """
+        WITH nouvelles AS (
+            SELECT s.ligne, s.etudiant_id::int AS etudiant_id, mj.jour,
+                   COUNT(*) OVER (PARTITION BY s.etudiant_id::int, mj.jour) AS nb
+            FROM planning.stg_inscriptions s
+            JOIN planning.compteur_module_jour mj
+              ON mj.module_id = s.module_id::int AND mj.nb_examens > 0
+            WHERE s.raison IS NULL
+              AND NOT EXISTS (
+                SELECT 1 FROM planning.inscriptions i
+                WHERE i.etudiant_id = s.etudiant_id::int AND i.module_id = s.module_id::int
+              )
+        )
+        UPDATE planning.stg_inscriptions s
+        SET raison = 'Conflit : l''étudiant a déjà un examen ce jour'
+        FROM nouvelles n
+        WHERE s.ligne = n.ligne AND (
+            n.nb > 1 OR EXISTS (
+                SELECT 1 FROM planning.compteur_etudiant_jour ce
+                WHERE ce.etudiant_id = n.etudiant_id AND ce.jour = n.jour AND ce.nb > 0
+            )
+        )
+        """,
+        # Places restantes dans les salles du module : les premières lignes
+        # passent, les suivantes sont rejetées
+        """
+        WITH places AS (
+            SELECT mj.module_id, MIN(mj.capacite) - COALESCE(MAX(cm.nb_inscrits), 0) AS restantes
+            FROM planning.compteur_module_jour mj
+            LEFT JOIN planning.compteur_module cm ON cm.module_id = mj.module_id
+            WHERE mj.nb_examens > 0
+            GROUP BY mj.module_id
+        ), nouvelles AS (
+            SELECT s.ligne, s.module_id::int AS module_id,
+                   ROW_NUMBER() OVER (PARTITION BY s.module_id::int ORDER BY s.ligne) AS rang
+            FROM planning.stg_inscriptions s
+            WHERE s.raison IS NULL
+              AND NOT EXISTS (
+                SELECT 1 FROM planning.inscriptions i
+                WHERE i.etudiant_id = s.etudiant_id::int AND i.module_id = s.module_id::int
+              )
+        )
+        UPDATE planning.stg_inscriptions s
+        SET raison = 'Salle pleine : capacité de l''examen atteinte'
+        FROM nouvelles n
+        JOIN places p ON p.module_id = n.module_id
+        WHERE s.ligne = n.ligne AND n.rang > p.restantes
+        """,
+    ],
+}
+
+# Prérequis : doit exister en base ou parmi les modules valides du fichier.
+# Répété tant qu'il rejette des lignes (un rejet peut en entraîner d'autres).
+VALIDATION_PREREQUIS = """
+    UPDATE planning.stg_modules s SET raison = 'prérequis inconnu'
+    WHERE s.raison IS NULL AND s.pre_req_id IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM planning.modules m WHERE m.id = s.pre_req_id::int)
+      AND NOT EXISTS (
+        SELECT 1 FROM planning.stg_modules v
+        WHERE v.raison IS NULL AND v.id::int = s.pre_req_id::int
+      )
+"""
+
+# =====================================
+# FUSION (nb insérés, nb mis à jour)
+# =====================================
+FUSION = {
+    "etudiants": """
+        WITH f AS (
+            INSERT INTO planning.etudiants (id, nom, prenom, formation_id, promo)
+            SELECT id::int, trim(nom), trim(prenom), formation_id::int, trim(promo)
+            FROM planning.stg_etudiants WHERE raison IS NULL
+            ON CONFLICT (id) DO UPDATE SET
+                nom = EXCLUDED.nom, prenom = EXCLUDED.prenom,
+                formation_id = EXCLUDED.formation_id, promo = EXCLUDED.promo
+            WHERE (etudiants.nom, etudiants.prenom, etudiants.formation_id, etudiants.promo)
+                IS DISTINCT FROM (EXCLUDED.nom, EXCLUDED.prenom, EXCLUDED.formation_id, EXCLUDED.promo)
+            RETURNING (xmax = 0) AS insere
+        )
+        SELECT COUNT(*) FILTER (WHERE insere), COUNT(*) FILTER (WHERE NOT insere) FROM f
+    """,
+    # Prérequis posés après coup : un module peut dépendre d'un module du même fichier
+    "modules": """
+        WITH f AS (
+            INSERT INTO planning.modules (id, nom, credits, formation_id)
+            SELECT id::int, trim(nom), credits::int, formation_id::int
+            FROM planning.stg_modules WHERE raison IS NULL
+            ON CONFLICT (id) DO UPDATE SET
+                nom = EXCLUDED.nom, credits = EXCLUDED.credits, formation_id = EXCLUDED.formation_id
+            WHERE (modules.nom, modules.credits, modules.formation_id)
+                IS DISTINCT FROM (EXCLUDED.nom, EXCLUDED.credits, EXCLUDED.formation_id)
+            RETURNING (xmax = 0) AS insere
+        )
+        SELECT COUNT(*) FILTER (WHERE insere), COUNT(*) FILTER (WHERE NOT insere) FROM f
+    """,
+    "inscriptions": """
+        WITH f AS (
+            INSERT INTO planning.inscriptions (etudiant_id, module_id, note)
+            SELECT etudiant_id::int, module_id::int, replace(trim(note), ',', '.')::numeric(4,2)
+            FROM planning.stg_inscriptions WHERE raison IS NULL
+            ON CONFLICT (etudiant_id, module_id) DO UPDATE SET note = EXCLUDED.note
+            WHERE inscriptions.note IS DISTINCT FROM EXCLUDED.note
+            RETURNING (xmax = 0) AS insere
+        )
+        SELECT COUNT(*) FILTER (WHERE insere), COUNT(*) FILTER (WHERE NOT insere) FROM f
+    """,
+}
+
+FUSION_PREREQUIS = """
+    UPDATE planning.modules m SET pre_req_id = s.pre_req_id::int
+    FROM planning.stg_modules s
+    WHERE s.raison IS NULL AND m.id = s.id::int
+      AND m.pre_req_id IS DISTINCT FROM s.pre_req_id::int
+"""
+
+# Les id sont fournis par les fichiers : les séquences SERIAL doivent suivre
+SEQUENCE = """
+    SELECT setval(pg_get_serial_sequence('planning.{table}', 'id'),
+                  GREATEST((SELECT MAX(id) FROM planning.{table}), 1))
+"""
+
+REJETS = """
+    SELECT 'etudiants' AS fichier, ligne + 1 AS ligne, raison FROM planning.stg_etudiants WHERE raison IS NOT NULL
+    UNION ALL
+    SELECT 'modules', ligne + 1, raison FROM planning.stg_modules WHERE raison IS NOT NULL
+    UNION ALL
+    SELECT 'inscriptions', ligne + 1, raison FROM planning.stg_inscriptions WHERE raison IS NOT NULL
+    ORDER BY 1, 2
+"""
+
+
+def _charger(cur, table, fichier):
+    """COPY du CSV dans planning.stg_<table> ; renvoie le nombre de lignes."""
+    requete = (
+        f"COPY planning.stg_{table} ({', '.join(COLONNES[table])}) "
+        "FROM STDIN WITH (FORMAT csv, HEADER)"
+    )
+    if isinstance(fichier, str):
+        with open(fichier, encoding="utf-8") as f:
+            cur.copy_expert(requete, f)
+    else:
+        cur.copy_expert(requete, fichier)
+    return cur.rowcount
+
+
+def importer(fichiers):
+    """Importe les CSV donnés ({"etudiants": chemin ou fichier ouvert, ...},
+    n'importe quel sous-ensemble de COLONNES).
+
+    Renvoie {"lignes", "inseres", "mis_a_jour", "rejets", "duree",
+    "lignes_par_seconde"} ; rejets = [(fichier, ligne, raison)]."""
+    inconnus = set(fichiers) - set(COLONNES)
+    if inconnus:
+        raise ValueError(f"Fichiers non reconnus : {', '.join(sorted(inconnus))}")
+
+    debut = time.perf_counter()
+    lignes, inseres, mis_a_jour = {}, {}, {}
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            # Import rejouable en cas de panne : pas besoin d'attendre le flush du WAL
+            cur.execute("SET LOCAL synchronous_commit = off")
+            # TRUNCATE verrouille les tables de chargement jusqu'au commit :
+            # deux imports simultanés s'exécutent l'un après l'autre
+            cur.execute(
+                "TRUNCATE planning.stg_etudiants, planning.stg_modules, "
+                "planning.stg_inscriptions RESTART IDENTITY"
+            )
+            for table in ORDRE:
+                if table in fichiers:
+                    lignes[table] = _charger(cur, table, fichiers[table])
+
+            for table in ORDRE:
+                if table not in fichiers:
+                    continue
+                for requete in VALIDATION[table]:
+                    cur.execute(requete)
+                if table == "modules":
+                    cur.execute(VALIDATION_PREREQUIS)
+                    while cur.rowcount:
+                        cur.execute(VALIDATION_PREREQUIS)
+
+                cur.execute(FUSION[table])
+                inseres[table], mis_a_jour[table] = cur.fetchone()
+                if table == "modules":
+                    cur.execute(FUSION_PREREQUIS)
+                if table != "inscriptions":
+                    cur.execute(SEQUENCE.format(table=table))
+
+            cur.execute(REJETS)
+            rejets = cur.fetchall()
+
+    invalider_tables(TABLES_MODIFIEES)
+    duree = time.perf_counter() - debut
+    total = sum(lignes.values())
+    return {
+        "lignes": lignes,
+        "inseres": inseres,
+        "mis_a_jour": mis_a_jour,
+        "rejets": rejets,
+        "duree": duree,
+        "lignes_par_seconde": total / duree if duree else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import CSV en masse (COPY + fusion en une transaction)")
+    for table, colonnes in COLONNES.items():
+        parser.add_argument(f"--{table}", metavar="CSV", help=f"colonnes : {', '.join(colonnes)}")
+    parser.add_argument("--rejets", metavar="CSV", help="écrit les lignes rejetées dans ce fichier")
+    args = parser.parse_args()
+
+    fichiers = {t: getattr(args, t) for t in COLONNES if getattr(args, t)}
+    if not fichiers:
+        parser.error("aucun fichier à importer")
+
+    rapport = importer(fichiers)
+    # Pas de rafraîchisseur dans ce processus : vues mises à jour avant de rendre la main
+    rafraichir(vues_de(TABLES_MODIFIEES))
+    for table in ORDRE:
+        if table in rapport["lignes"]:
+            nb_rejets = sum(1 for r in rapport["rejets"] if r[0] == table)
+            print(
+                f"{table:13} {rapport['lignes'][table]:>8} lignes  "
+                f"{rapport['inseres'][table]:>8} insérées  "
+                f"{rapport['mis_a_jour'][table]:>8} mises à jour  {nb_rejets:>6} rejetées"
+            )
+    print(f"Durée : {rapport['duree']:.1f} s ({rapport['lignes_par_seconde']:.0f} lignes/s)")
+
+    for fichier, ligne, raison in rapport["rejets"][:20]:
+        print(f"  {fichier} ligne {ligne} : {raison}")
+    if len(rapport["rejets"]) > 20:
+        print(f"  ... {len(rapport['rejets']) - 20} autres rejets")
+    if args.rejets:
+        with open(args.rejets, "w", newline="", encoding="utf-8") as f:
+            ecrivain = csv.writer(f)
+            ecrivain.writerow(["fichier", "ligne", "raison"])
+            ecrivain.writerows(rapport["rejets"])
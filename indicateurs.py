@@ -0,0 +1,122 @@
+# indicateurs.py - Qualité d'un planning calculée en NumPy (vectorisé)
+import numpy as np
+import pandas as pd
+from generation import MAX_EXAMENS_PROF_JOUR
+from instantane import examens_detailles, instantane, table
+
+# Tables lues par charger_plan (le plan est recalculé quand l'une change)
+TABLES_PLAN = ("examens", "inscriptions", "lieu_examen", "modules", "formations", "departements", "professeurs")
+
+
+class PlanVectorise:
+    """Un planning chargé une fois en tableaux NumPy (une case par ligne d'examen).
+
+    df_examens : id, module_id, prof_id, salle_id, date_heure, capacite, departement
+    df_inscriptions : etudiant_id, module_id
+    Les places d'un module réparti sur plusieurs salles sont partagées au
+    prorata des capacités."""
+
+    def __init__(self, df_examens, df_inscriptions):
+        dates = pd.to_datetime(df_examens["date_heure"]).to_numpy("datetime64[D]")
+        self.premier_jour = dates.min() if len(dates) else np.datetime64("today")
+        self.jour = (dates - self.premier_jour).astype(np.int32)
+        self.capacite = df_examens["capacite"].to_numpy(np.float64, na_value=0)
+        self.prof, self.prof_ids = pd.factorize(df_examens["prof_id"])
+        self.departement, self.departements = pd.factorize(df_examens["departement"])
+
+        # Modules : codes partagés entre examens et inscriptions
+        modules = pd.Index(df_examens["module_id"].unique())
+        self.module = modules.get_indexer(df_examens["module_id"])
+        code_inscr = modules.get_indexer(df_inscriptions["module_id"])
+        planifie = code_inscr >= 0
+        self.etudiant, self.etudiant_ids = pd.factorize(df_inscriptions["etudiant_id"].to_numpy()[planifie])
+        code_inscr = code_inscr[planifie]
+
+        nb_modules = len(modules)
+        self.effectif = np.bincount(code_inscr, minlength=nb_modules).astype(np.float64)
+        capacite_module = np.bincount(self.module, weights=self.capacite, minlength=nb_modules)
+        part = np.divide(self.effectif, capacite_module, out=np.zeros(nb_modules), where=capacite_module > 0)
+        self.places = self.capacite * np.minimum(part, 1.0)[self.module]
+
+        # Jour de chaque module, puis de chaque inscription
+        jour_module = np.full(nb_modules, np.iinfo(np.int32).max, dtype=np.int32)
+        np.minimum.at(jour_module, self.module, self.jour)
+        self.jour_inscription = jour_module[code_inscr]
+
+    # ============================================
+    # MESURES
+    # ============================================
+
+    def ecarts(self):
+        """(etudiant, écart en jours) entre deux examens consécutifs d'un étudiant."""
+        ordre = np.lexsort((self.jour_inscription, self.etudiant))
+        etudiants, jours = self.etudiant[ordre], self.jour_inscription[ordre]
+        suivant = etudiants[1:] == etudiants[:-1]
+        return etudiants[1:][suivant], np.diff(jours)[suivant]
+
+    def ecart_minimal(self):
+        """Plus petit écart (jours) par étudiant ayant au moins deux examens."""
+        etudiants, ecarts = self.ecarts()
+        minimum = np.full(len(self.etudiant_ids), np.iinfo(np.int32).max, dtype=np.int64)
+        np.minimum.at(minimum, etudiants, ecarts)
+        return minimum[minimum != np.iinfo(np.int32).max]
+
+    def remplissage(self):
+        """Taux de remplissage (0-1) de chaque salle réservée."""
+        return np.divide(self.places, self.capacite, out=np.zeros_like(self.places), where=self.capacite > 0)
+
+    def charge_prof_jour(self):
+        """Nombre d'examens par (professeur, jour) pour les couples non vides."""
+        nb_jours = int(self.jour.max()) + 1 if len(self.jour) else 1
+        affecte = self.prof >= 0
+        charge = np.bincount(self.prof[affecte] * nb_jours + self.jour[affecte])
+        return charge[charge > 0]
+
+    def utilisation_departements(self):
+        """Examens, places occupées et capacité réservée par département."""
+        n = len(self.departements)
+        places = np.bincount(self.departement, weights=self.places, minlength=n)
+        capacite = np.bincount(self.departement, weights=self.capacite, minlength=n)
+        return pd.DataFrame({
+            "departement": self.departements,
+            "nb_examens": np.bincount(self.departement, minlength=n),
+            "places": places.round().astype(int),
+            "capacite": capacite.astype(int),
+            "taux_utilisation": np.round(100 * np.divide(places, capacite, out=np.zeros(n), where=capacite > 0), 2),
+        }).sort_values("departement", ignore_index=True)
+
+    def resume(self):
+        """Indicateurs clés du planning, pour affichage ou comparaison."""
+        ecart = self.ecart_minimal()
+        remplissage = self.remplissage()
+        charge_jour = self.charge_prof_jour()
+        charge_prof = np.bincount(self.prof[self.prof >= 0], minlength=len(self.prof_ids))
+        return {
+            "Examens": len(self.jour),
+            "Étudiants": len(self.etudiant_ids),
+            "Étudiants avec 2 examens le même jour": int((ecart == 0).sum()),
+            "Étudiants avec 2 jours d'affilée (%)": round(100 * float((ecart == 1).mean()), 2) if len(ecart) else 0.0,
+            "Écart minimal moyen (jours)": round(float(ecart.mean()), 2) if len(ecart) else 0.0,
+            "Remplissage médian (%)": round(100 * float(np.median(remplissage)), 2) if len(remplissage) else 0.0,
+            "Salles remplies à moins de 50 %": int((remplissage < 0.5).sum()),
+            "Charge max professeur / jour": int(charge_jour.max()) if len(charge_jour) else 0,
+            f"Jours professeur > {MAX_EXAMENS_PROF_JOUR} examens": int((charge_jour > MAX_EXAMENS_PROF_JOUR).sum()),
+            "Écart-type charge professeurs": round(float(charge_prof.std()), 2) if len(charge_prof) else 0.0,
+        }
+
+
+def comparer(plans):
+    """Indicateurs de plusieurs plans côte à côte : {nom: PlanVectorise} -> DataFrame."""
+    return pd.DataFrame({nom: plan.resume() for nom, plan in plans.items()})
+
+
+_plan = (None, None)   # (versions des tables, PlanVectorise) partagé entre sessions
+
+
+def charger_plan():
+    """Planning actuel, construit depuis l'instantané et réutilisé tant qu'il n'a pas changé."""
+    global _plan
+    versions = instantane.version(*TABLES_PLAN)
+    if _plan[0] != versions:
+        _plan = (versions, PlanVectorise(examens_detailles(), table("inscriptions")))
+    return _plan[1]
@@ -0,0 +1,131 @@
+# instantane.py - Instantané en colonnes du schéma planning, partagé entre sessions
+import io
+import threading
+import time
+import pandas as pd
+from cache import abonner
+from db import connexion
+
+# Table -> colonnes et types compacts (entiers 32 bits, catégories, datetime64) ;
+# Int32 / Int16 (types nullables) pour toute colonne sans NOT NULL dans bdd1
+TABLES = {
+    "departements": {"id": "int32", "nom": "category"},
+    "formations": {"id": "int32", "nom": "category", "dept_id": "Int32"},
+    "modules": {"id": "int32", "nom": "category", "formation_id": "Int32"},
+    "professeurs": {"id": "int32", "nom": "category", "dept_id": "Int32", "total_surveillance": "Int32"},
+    "lieu_examen": {"id": "int32", "nom": "category", "capacite": "Int32", "batiment": "category"},
+    "examens": {
+        "id": "int32", "module_id": "Int32", "prof_id": "Int32", "salle_id": "Int32",
+        "periode_id": "Int32", "date_heure": "datetime64[ns]", "duree_minutes": "Int16",
+    },
+    "inscriptions": {"etudiant_id": "int32", "module_id": "int32"},
+}
+
+VERIFICATION_SECONDES = 2   # intervalle minimal entre deux lectures des versions
+
+
+def copier(table):
+    """Charge une table par COPY ... TO STDOUT dans un DataFrame typé.
+
+    Renvoie (version, DataFrame) ; la version est lue avant la copie, un
+    instantané n'est donc jamais plus récent que sa version."""
+    types = TABLES[table]
+    colonnes = list(types)
+    tampon = io.StringIO()
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT version FROM planning.version_donnees WHERE table_nom = %s", (table,))
+            ligne = cur.fetchone()
+            cur.copy_expert(
+                f"COPY (SELECT {', '.join(colonnes)} FROM planning.{table}) TO STDOUT WITH (FORMAT csv)",
+                tampon
+            )
+    tampon.seek(0)
+    dates = [c for c, t in types.items() if t.startswith("datetime")]
+    df = pd.read_csv(
+        tampon, names=colonnes, parse_dates=dates,
+        dtype={c: t for c, t in types.items() if c not in dates}
+    )
+    return (ligne[0] if ligne else 0), df
+
+
+class Instantane:
+    """Tables du schéma planning en mémoire, une copie par processus.
+
+    Chaque table est rechargée seulement quand son compteur dans
+    planning.version_donnees (triggers de bdd1) a changé. Les DataFrames
+    renvoyés sont partagés par toutes les sessions : ils ne doivent pas être
+    modifiés (faire .copy() avant)."""
+
+    def __init__(self, verification=VERIFICATION_SECONDES):
+        self.verification = verification
+        self._tables = {}           # table -> (version, DataFrame)
+        self._versions = {}         # dernières versions lues en base
+        self._lu_a = 0.0
+        self._verrou = threading.Lock()
+        abonner(self.signaler)
+
+    def signaler(self, tables):
+        """Écriture locale : relire les versions au prochain accès."""
+        if set(tables) & set(TABLES):
+            self._lu_a = 0.0
+
+    def _lire_versions(self):
+        with connexion() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT table_nom, version FROM planning.version_donnees")
+                self._versions = dict(cur.fetchall())
+        self._lu_a = time.monotonic()
+
+    def table(self, nom):
+        with self._verrou:
+            if time.monotonic() - self._lu_a >= self.verification:
+                self._lire_versions()
+            actuelle = self._tables.get(nom)
+            if actuelle is None or actuelle[0] != self._versions.get(nom, 0):
+                actuelle = self._tables[nom] = copier(nom)
+            return actuelle[1]
+
+    def vider(self):
+        """Oublie les tables chargées : le prochain accès relit la base."""
+        with self._verrou:
+            self._tables.clear()
+            self._lu_a = 0.0
+
+    def version(self, *noms):
+        """Versions des tables données (clé de cache pour des calculs dérivés)."""
+        for nom in noms:
+            self.table(nom)
+        return tuple(self._tables[nom][0] for nom in noms)
+
+
+instantane = Instantane()
+
+
+def table(nom):
+    return instantane.table(nom)
+
+
+def examens_detailles():
+    """Examens placés avec capacité de la salle, département et noms."""
+    examens = table("examens").dropna(subset=["module_id", "salle_id"])
+    salles = table("lieu_examen").rename(columns={"id": "salle_id", "nom": "salle"})
+    profs = table("professeurs")[["id", "nom"]].rename(columns={"id": "prof_id", "nom": "professeur"})
+    modules = table("modules")[["id", "formation_id"]].rename(columns={"id": "module_id"})
+    formations = table("formations")[["id", "dept_id"]].rename(columns={"id": "formation_id"})
+    departements = table("departements").rename(columns={"id": "dept_id", "nom": "departement"})
+    return (
+        examens
+        .merge(salles[["salle_id", "salle", "capacite"]], on="salle_id")
+        .merge(modules, on="module_id")
+        .merge(formations, on="formation_id")
+        .merge(departements, on="dept_id")
+        .merge(profs, on="prof_id", how="left")
+    )
+
+
+def inscriptions_examens(examens):
+    """(etudiant_id, examen_id) des examens donnés, via le module de l'examen."""
+    return table("inscriptions").merge(
+        examens[["id", "module_id"]].rename(columns={"id": "examen_id"}), on="module_id"
+    )[["etudiant_id", "examen_id"]]
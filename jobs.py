@@ -0,0 +1,240 @@
+# jobs.py - Tâches longues (génération, optimisation) exécutées hors de Streamlit
+#
+# Lancer le worker : python jobs.py [nb_processus]
+import importlib
+import json
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from psycopg2.extras import Json
+from cache import cache_requetes
+from db import connexion, lire_sql
+from rafraichissement import rafraichir, vues_de
+
+# Type de tâche -> fonction appelée avec ses paramètres et progression=...
+TACHES = {
+    "generation": ("generation", "generer_formation"),
+    "generation_faculte": ("generation", "generer_faculte"),
+    "optimisation": ("optimisation", "optimiser_session"),
+    "amelioration": ("recuit", "ameliorer_session"),
+}
+
+# Tables écrites par chaque type de tâche. Le worker rafraîchit les vues
+# matérialisées qui en dépendent ; le cache des requêtes étant propre à chaque
+# processus, l'interface invalide le sien à son tour (termines_vus)
+TABLES_ECRITES = {
+    "generation": {"examens"},
+    "generation_faculte": {"examens"},
+    "optimisation": {"examens"},
+    "amelioration": {"examens"},
+}
+
+NB_PROCESSUS = 4
+ATTENTE_SECONDES = 1.0
+INTERVALLE_PROGRESSION = 0.5  # secondes entre deux écritures de progression
+INTERVALLE_BATTEMENT = 30     # secondes entre deux signes de vie d'une tâche en cours
+SILENCE_MAX_SECONDES = 300    # sans signe de vie depuis, une tâche « en cours » est abandonnée
+
+journal = logging.getLogger("planning.jobs")
+
+
+class JobAnnule(Exception):
+    pass
+
+
+def _json(valeur):
+    return Json(valeur, dumps=lambda v: json.dumps(v, default=str))
+
+# ============================================
+# CÔTÉ INTERFACE
+# ============================================
+
+def soumettre(type_job, parametres=None):
+    """Enregistre une tâche à exécuter et renvoie son id."""
+    if type_job not in TACHES:
+        raise ValueError(f"Type de tâche inconnu : {type_job}")
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO planning.jobs (type, parametres) VALUES (%s, %s) RETURNING id",
+                (type_job, _json(parametres or {}))
+            )
+            return cur.fetchone()[0]
+
+
+def annuler(job_id):
+    """Demande l'arrêt d'une tâche ; une tâche pas encore démarrée est annulée tout de suite."""
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE planning.jobs
+                SET annulation_demandee = TRUE,
+                    statut = CASE WHEN statut = 'en attente' THEN 'annulé' ELSE statut END,
+                    finished_at = CASE WHEN statut = 'en attente' THEN NOW() ELSE finished_at END
+                WHERE id = %s AND statut IN ('en attente', 'en cours')
+            """, (job_id,))
+
+
+def lister(types=None, limite=20):
+    """Dernières tâches, éventuellement d'un type ou d'une liste de types."""
+    if isinstance(types, str):
+        types = [types]
+    return lire_sql("""
+        SELECT id, type, statut, progression, message, created_at, started_at, finished_at
+        FROM planning.jobs
+        WHERE %(types)s::varchar[] IS NULL OR type = ANY(%(types)s::varchar[])
+        ORDER BY id DESC
+        LIMIT %(limite)s
+    """, {"types": types, "limite": limite}, cache=False)
+
+
+def resultat(job_id):
+    df = lire_sql("SELECT resultat FROM planning.jobs WHERE id = %s", (job_id,), cache=False)
+    return None if df.empty else df.iloc[0, 0]
+
+
+_termines_vus = set()
+_verrou_termines = threading.Lock()
+
+
+def termines_vus(df_jobs):
+    """Invalide dans le cache des requêtes de ce processus les tables (et les
+    vues matérialisées, déjà rafraîchies par le worker) écrites par les
+    tâches terminées pas encore vues."""
+    termines = df_jobs.loc[df_jobs["statut"] == "terminé", ["id", "type"]]
+    with _verrou_termines:
+        nouveaux = [(int(i), t) for i, t in termines.itertuples(index=False) if int(i) not in _termines_vus]
+        _termines_vus.update(i for i, _ in nouveaux)
+    tables = set().union(*(TABLES_ECRITES.get(t, set()) for _, t in nouveaux))
+    if tables:
+        cache_requetes.invalider(tables | vues_de(tables))
+
+# ============================================
+# CÔTÉ WORKER
+# ============================================
+
+def _terminer(job_id, statut, resultat=None, message=None):
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE planning.jobs
+                SET statut = %s, resultat = %s, message = COALESCE(%s, message),
+                    progression = CASE WHEN %s = 'terminé' THEN 100 ELSE progression END,
+                    finished_at = NOW()
+                WHERE id = %s
+            """, (statut, _json(resultat) if resultat is not None else None, message, statut, job_id))
+
+
+def _battre(job_id):
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE planning.jobs SET heartbeat_at = NOW() WHERE id = %s", (job_id,))
+
+
+def _battement(job_id, arret, intervalle=INTERVALLE_BATTEMENT):
+    """Signe de vie périodique, même pendant une longue étape sans progression."""
+    while not arret.wait(intervalle):
+        try:
+            _battre(job_id)
+        except Exception:
+            journal.exception("Battement impossible pour la tâche %s", job_id)
+
+
+def executer_job(job_id, type_job, parametres):
+    """Exécute une tâche dans un processus du pool et publie sa progression."""
+    dernier = [0.0]
+
+    def progression(pourcentage, message=None):
+        maintenant = time.monotonic()
+        if maintenant - dernier[0] < INTERVALLE_PROGRESSION and pourcentage < 100:
+            return
+        dernier[0] = maintenant
+        with connexion() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE planning.jobs
+                    SET progression = %s, message = COALESCE(%s, message), heartbeat_at = NOW()
+                    WHERE id = %s
+                    RETURNING annulation_demandee
+                """, (min(100, max(0, int(pourcentage))), message, job_id))
+                annule = cur.fetchone()[0]
+        if annule:
+            raise JobAnnule()
+
+    module, fonction = TACHES[type_job]
+    arret = threading.Event()
+    threading.Thread(target=_battement, args=(job_id, arret), name=f"battement-{job_id}", daemon=True).start()
+    try:
+        tache = getattr(importlib.import_module(module), fonction)
+        resultat_tache = tache(progression=progression, **parametres)
+        # Vues à jour avant que l'interface ne voie la tâche terminée
+        vues = vues_de(TABLES_ECRITES.get(type_job, set()))
+        try:
+            rafraichir(vues)
+        except Exception:
+            journal.exception("Rafraîchissement des vues impossible après la tâche %s", job_id)
+        _terminer(job_id, "terminé", resultat_tache)
+    except JobAnnule:
+        _terminer(job_id, "annulé", message="Annulé à la demande")
+    except Exception as e:
+        _terminer(job_id, "échoué", message=str(e))
+    finally:
+        arret.set()
+
+
+def liberer_abandonnes(silence_max=SILENCE_MAX_SECONDES):
+    """Passe en échec les tâches « en cours » sans signe de vie depuis plus de
+    silence_max secondes (worker arrêté ou planté pendant l'exécution), quelle
+    que soit leur durée totale. Renvoie leur nombre."""
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE planning.jobs
+                SET statut = 'échoué', finished_at = NOW(),
+                    message = 'Tâche abandonnée (worker interrompu)'
+                WHERE statut = 'en cours'
+                  AND COALESCE(heartbeat_at, started_at) < NOW() - make_interval(secs => %s)
+            """, (silence_max,))
+            return cur.rowcount
+
+
+def reserver_jobs(nombre):
+    """Passe au plus `nombre` tâches en attente à « en cours » (SKIP LOCKED : plusieurs workers possibles)."""
+    if nombre <= 0:
+        return []
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE planning.jobs
+                SET statut = 'en cours', started_at = NOW(), heartbeat_at = NOW()
+                WHERE id IN (
+                    SELECT id FROM planning.jobs
+                    WHERE statut = 'en attente' AND NOT annulation_demandee
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, type, parametres
+            """, (nombre,))
+            return cur.fetchall()
+
+
+def travailler(nb_processus=NB_PROCESSUS, attente=ATTENTE_SECONDES):
+    """Boucle du worker : distribue les tâches en attente sur un pool de processus."""
+    # spawn : chaque processus ouvre son propre pool de connexions
+    contexte = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=nb_processus, mp_context=contexte) as executeur:
+        en_cours = set()
+        while True:
+            liberer_abandonnes()
+            en_cours = {f for f in en_cours if not f.done()}
+            for job_id, type_job, parametres in reserver_jobs(nb_processus - len(en_cours)):
+                en_cours.add(executeur.submit(executer_job, job_id, type_job, parametres))
+            time.sleep(attente)
+
+
+if __name__ == "__main__":
+    travailler(int(sys.argv[1]) if len(sys.argv) > 1 else NB_PROCESSUS)
@@ -0,0 +1,161 @@
+# mesures.py - Temps des requêtes SQL par page : histogrammes et requêtes lentes
+#
+# Alimenté par le curseur de db.py : chaque requête passée par le pool est
+# comptée sous (page appelante, texte normalisé de la requête).
+import contextvars
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+SEUIL_LENT_MS = 500              # au-delà, la requête est journalisée avec son plan
+INTERVALLE_PLAN_SECONDES = 300   # un plan relevé au plus par requête et par intervalle
+LENTES_MAX = 50                  # requêtes lentes gardées pour le panneau admin
+# Classes de l'histogramme (ms) : progression géométrique de 0,1 ms à ~2 min
+BORNES_MS = [0.1 * 1.2 ** i for i in range(78)]
+
+journal = logging.getLogger("planning.requetes_lentes")
+
+_page = contextvars.ContextVar("page", default="autre")
+_ESPACES = re.compile(r"\s+")
+_LITTERAUX = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_TUPLES = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+
+
+def definir_page(nom):
+    """Page à laquelle sont attribuées les requêtes qui suivent (session courante)."""
+    _page.set(nom)
+
+
+@contextmanager
+def sur_page(nom):
+    """Attribue à nom les requêtes du bloc, puis rétablit la page précédente."""
+    jeton = _page.set(nom)
+    try:
+        yield
+    finally:
+        _page.reset(jeton)
+
+
+def normaliser(requete):
+    """Texte de regroupement : valeurs littérales remplacées par ?, listes
+    VALUES (execute_values) réduites à leur premier tuple."""
+    if isinstance(requete, bytes):
+        requete = requete.decode(errors="replace")
+    requete = _TUPLES.sub(r"\1, ...", _LITTERAUX.sub("?", requete))
+    return _ESPACES.sub(" ", requete).strip()
+
+
+class Histogramme:
+    """Nombre d'appels par classe de durée : mémoire fixe quel que soit le trafic."""
+
+    __slots__ = ("classes", "nb", "total_ms", "max_ms", "lignes")
+
+    def __init__(self):
+        self.classes = [0] * (len(BORNES_MS) + 1)
+        self.nb = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.lignes = 0
+
+    def ajouter(self, ms, lignes):
+        self.classes[bisect_left(BORNES_MS, ms)] += 1
+        self.nb += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.lignes += max(lignes, 0)
+
+    def quantile(self, q):
+        """Borne haute de la classe qui contient le quantile q (majorant à 20 % près)."""
+        rang, cumul = q * self.nb, 0
+        for i, n in enumerate(self.classes):
+            cumul += n
+            if n and cumul >= rang:
+                return min(BORNES_MS[i] if i < len(BORNES_MS) else self.max_ms, self.max_ms)
+        return self.max_ms
+
+
+class Mesures:
+    """Histogrammes par (page, requête) et journal des requêtes lentes,
+    partagés par toutes les sessions du processus."""
+
+    def __init__(self, seuil_ms=SEUIL_LENT_MS, intervalle_plan=INTERVALLE_PLAN_SECONDES):
+        self.seuil_ms = seuil_ms
+        self.intervalle_plan = intervalle_plan
+        self._histogrammes = {}             # (page, requête) -> Histogramme
+        self._lentes = deque(maxlen=LENTES_MAX)
+        self._plans_a = {}                  # requête -> instant du dernier plan relevé
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, requete, duree, lignes):
+        """Ajoute un appel (durée en secondes) pour la page courante.
+
+        Requête lente dont le plan n'a pas été relevé récemment : renvoie
+        l'entrée du journal, dont le champ "plan" reste à remplir. Sinon None."""
+        ms = duree * 1000
+        cle = (_page.get(), normaliser(requete))
+        with self._verrou:
+            histogramme = self._histogrammes.get(cle)
+            if histogramme is None:
+                histogramme = self._histogrammes[cle] = Histogramme()
+            histogramme.ajouter(ms, lignes)
+            if ms < self.seuil_ms:
+                return None
+
+            entree = {
+                "date": datetime.now(), "page": cle[0], "requete": cle[1],
+                "duree_ms": round(ms, 1), "lignes": lignes, "plan": None,
+            }
+            self._lentes.append(entree)
+            maintenant = time.monotonic()
+            a_relever = maintenant - self._plans_a.get(cle[1], float("-inf")) >= self.intervalle_plan
+            if a_relever:
+                self._plans_a[cle[1]] = maintenant
+        if not a_relever:
+            journal.warning("Requête lente (%s, %.0f ms, %s lignes) : %s", cle[0], ms, lignes, cle[1])
+            return None
+        return entree
+
+    def plan_releve(self, entree, plan):
+        entree["plan"] = plan
+        journal.warning(
+            "Requête lente (%s, %.0f ms, %s lignes) : %s\n%s",
+            entree["page"], entree["duree_ms"], entree["lignes"], entree["requete"], plan
+        )
+
+    def statistiques(self):
+        """Une ligne par (page, requête) : appels, lignes, p50 / p95 / p99 (ms)."""
+        with self._verrou:
+            lignes = [
+                {
+                    "page": page, "requete": requete, "appels": h.nb,
+                    "lignes_moy": round(h.lignes / h.nb, 1),
+                    "p50_ms": round(h.quantile(0.50), 1),
+                    "p95_ms": round(h.quantile(0.95), 1),
+                    "p99_ms": round(h.quantile(0.99), 1),
+                    "max_ms": round(h.max_ms, 1),
+                    "total_s": round(h.total_ms / 1000, 2),
+                }
+                for (page, requete), h in self._histogrammes.items()
+            ]
+        colonnes = ["page", "requete", "appels", "lignes_moy", "p50_ms", "p95_ms", "p99_ms", "max_ms", "total_s"]
+        return pd.DataFrame(lignes, columns=colonnes).sort_values("total_s", ascending=False, ignore_index=True)
+
+    def lentes(self):
+        """Requêtes lentes, de la plus récente à la plus ancienne."""
+        with self._verrou:
+            return list(reversed(self._lentes))
+
+    def reinitialiser(self):
+        with self._verrou:
+            self._histogrammes.clear()
+            self._lentes.clear()
+            self._plans_a.clear()
+
+
+mesures = Mesures()
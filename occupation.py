@@ -0,0 +1,48 @@
+# occupation.py - Index de disponibilité des ressources (salles, professeurs)
+from bisect import bisect_left, insort
+
+
+class IndexOccupation:
+    """Intervalles [debut, fin) triés par ressource.
+
+    « Cette ressource est-elle libre sur [debut, fin) ? » se résout par
+    recherche dichotomique : seuls les intervalles commençant après
+    debut - durée max de la ressource peuvent chevaucher."""
+
+    def __init__(self):
+        self._intervalles = {}   # ressource -> liste triée (debut, fin, n°, ident)
+        self._duree_max = {}     # ressource -> plus longue durée enregistrée
+        self._compteur = 0       # départage les intervalles identiques
+
+    def ajouter(self, ressource, debut, fin, ident=None):
+        self._compteur += 1
+        insort(self._intervalles.setdefault(ressource, []), (debut, fin, self._compteur, ident))
+        duree = fin - debut
+        if ressource not in self._duree_max or duree > self._duree_max[ressource]:
+            self._duree_max[ressource] = duree
+
+    def retirer(self, ressource, debut, fin, ident=None):
+        intervalles = self._intervalles.get(ressource, [])
+        k = bisect_left(intervalles, (debut, fin))
+        while k < len(intervalles) and intervalles[k][:2] == (debut, fin):
+            if intervalles[k][3] == ident:
+                del intervalles[k]
+                return
+            k += 1
+
+    def occupants(self, ressource, debut, fin):
+        """Identifiants des intervalles qui chevauchent [debut, fin)."""
+        intervalles = self._intervalles.get(ressource)
+        if not intervalles:
+            return []
+        k = bisect_left(intervalles, (debut - self._duree_max[ressource],))
+        trouves = []
+        while k < len(intervalles) and intervalles[k][0] < fin:
+            f, ident = intervalles[k][1], intervalles[k][3]
+            if f > debut:
+                trouves.append(ident)
+            k += 1
+        return trouves
+
+    def est_libre(self, ressource, debut, fin):
+        return not self.occupants(ressource, debut, fin)
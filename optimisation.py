@@ -0,0 +1,136 @@
+# optimisation.py - Optimisation des salles et créneaux d'examen
+from datetime import timedelta
+import pandas as pd
+from conflits import IndexConflits
+from occupation import IndexOccupation
+from salles import AllocateurSalles
+from db import connexion
+from ecriture import appliquer_optimisation
+from instantane import table
+
+# Créneaux possibles (8h-10h, 10h-12h, ... jusqu'à 18h)
+DEBUT_JOUR = 8
+FIN_JOUR = 18
+DUREE_CRENEAU = 120  # en minutes
+
+
+def optimiser_ressources(df_examens, df_salles, df_inscriptions, progression=None):
+    """Réaffecte salles et créneaux sans conflit salle / professeur / étudiant.
+
+    L'unité déplacée est un module à un horaire (une ligne par salle), comme
+    dans recuit.RechercheLocale : toutes ses salles changent de créneau
+    ensemble et sont choisies pour l'effectif du module entier.
+
+    df_examens : examen_id, module_id, prof_id, salle_id, date_heure, duree_minutes
+    df_salles : salle_id, nom, capacite, batiment
+    df_inscriptions : etudiant_id, module_id
+    progression : fonction(pourcentage) appelée au fil du traitement
+    Renvoie la liste des affectations (salle_id à None si aucun créneau)."""
+    index = IndexConflits(df_inscriptions, cle="module_id")
+    allocateur = AllocateurSalles(df_salles.rename(columns={"salle_id": "id"}))
+    heures_creneaux = [
+        DEBUT_JOUR * 60 + DUREE_CRENEAU * i
+        for i in range((FIN_JOUR - DEBUT_JOUR) * 60 // DUREE_CRENEAU)
+    ]
+
+    # Lignes d'un même module au même horaire regroupées
+    unites = {}
+    for examen in df_examens.to_dict("records"):
+        unites.setdefault((examen["module_id"], examen["date_heure"]), []).append(examen)
+    optimisation = []
+
+    # Occupation des professeurs et des modules placés
+    occupation_profs = IndexOccupation()
+    places = IndexOccupation()
+
+    def salles_libres(module, profs, nb_lignes, debut, fin):
+        """Une salle par ligne de l'unité pour l'effectif du module, ou None."""
+        if not all(occupation_profs.est_libre(p, debut, fin) for p in profs):
+            return None
+        # Un seul test vectorisé contre tous les modules déjà placés sur ce créneau
+        if index.conflit_avec(module, places.occupants(None, debut, fin)):
+            return None
+        repartition = allocateur.allouer(index.effectif(module), debut, fin)
+        if not repartition or len(repartition) > nb_lignes:
+            return None
+        # Lignes en trop (moins de salles qu'avant) : plus petites salles libres restantes
+        prises = {salle[1] for salle, _ in repartition}
+        for salle in allocateur.salles:
+            if len(repartition) == nb_lignes:
+                break
+            if salle[1] not in prises and allocateur.occupation.est_libre(salle[1], debut, fin):
+                repartition.append((salle, 0))
+        return repartition if len(repartition) == nb_lignes else None
+
+    for n, ((module, date_heure), lignes) in enumerate(unites.items()):
+        if progression:
+            progression(int(n / len(unites) * 100))
+        duree = timedelta(minutes=int(max(e["duree_minutes"] for e in lignes)))
+        profs = {e["prof_id"] for e in lignes if not pd.isna(e["prof_id"])}
+        # Créneau initial d'abord, puis les autres créneaux du même jour
+        candidats = [(date_heure, False)] + [
+            (date_heure.replace(hour=minutes // 60, minute=minutes % 60), True)
+            for minutes in heures_creneaux
+        ]
+
+        for debut, deplace in candidats:
+            fin = debut + duree
+            repartition = salles_libres(module, profs, len(lignes), debut, fin)
+            if repartition:
+                allocateur.reserver(repartition, debut, fin, module)
+                for p in profs:
+                    occupation_profs.ajouter(p, debut, fin, module)
+                places.ajouter(None, debut, fin, module)
+                for examen, ((_, salle_id, salle_nom, _), _) in zip(lignes, repartition):
+                    optimisation.append({
+                        "examen_id": examen["examen_id"],
+                        "salle_id": salle_id,
+                        "Salle": salle_nom,
+                        "prof_id": examen["prof_id"],
+                        "date_heure": debut,
+                        "date_fin": fin,
+                        "deplace": deplace
+                    })
+                break
+        else:
+            # Aucun créneau dispo pour le module
+            optimisation += [{
+                "examen_id": examen["examen_id"],
+                "salle_id": None,
+                "Salle": "Aucune salle disponible",
+                "prof_id": examen["prof_id"],
+                "date_heure": date_heure,
+                "date_fin": date_heure + duree,
+                "deplace": False
+            } for examen in lignes]
+
+    return optimisation
+
+
+def optimiser_session(progression=None):
+    """Charge tous les examens, les optimise puis écrit le résultat en une transaction."""
+    examens = table("examens")
+    # Durée ou capacité NULL : examen ou salle hors optimisation
+    df_examens = examens[["id", "module_id", "prof_id", "salle_id", "date_heure", "duree_minutes"]] \
+        .dropna(subset=["duree_minutes"]).rename(columns={"id": "examen_id"})
+    df_salles = table("lieu_examen").dropna(subset=["capacite"]).rename(columns={"id": "salle_id"}) \
+        .sort_values("capacite", ascending=False)
+    inscriptions = table("inscriptions")
+    df_inscriptions = inscriptions[inscriptions["module_id"].isin(df_examens["module_id"])]
+
+    if df_examens.empty or df_salles.empty:
+        raise ValueError("Aucun examen ou salle trouvé pour optimiser")
+
+    # Calcul : 0-90 %, écriture : 90-100 %
+    suivi = (lambda p: progression(p * 9 // 10)) if progression else None
+    optimisation = optimiser_ressources(df_examens, df_salles, df_inscriptions, suivi)
+    if progression:
+        progression(90)
+
+    with connexion() as conn:
+        appliquer_optimisation(conn, optimisation)
+
+    return sorted(
+        ({k: v for k, v in e.items() if k != "deplace"} for e in optimisation),
+        key=lambda e: (e["date_heure"], e["Salle"])
+    )
@@ -0,0 +1,88 @@
+# rafraichissement.py - Rafraîchissement en tâche de fond des vues matérialisées
+import logging
+import threading
+from cache import abonner, cache_requetes
+from db import connexion
+
+# Vue matérialisée -> tables dont elle dépend
+VUES_MATERIALISEES = {
+    "mv_occupation_salles": {"lieu_examen", "examens", "inscriptions"},
+    "mv_indicateurs": {"examens", "etudiants", "lieu_examen", "professeurs"},
+}
+
+PERIODE_SECONDES = 300   # rafraîchissement périodique de sécurité
+DELAI_SECONDES = 2       # regroupe les écritures rapprochées
+
+journal = logging.getLogger("planning.rafraichissement")
+
+
+def vues_de(tables):
+    """Vues matérialisées qui dépendent d'une des tables données."""
+    return {v for v, deps in VUES_MATERIALISEES.items() if deps & set(tables)}
+
+
+def rafraichir(vues=None):
+    """REFRESH CONCURRENTLY : les lectures ne sont jamais bloquées."""
+    vues = list(VUES_MATERIALISEES if vues is None else vues)
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            for vue in vues:
+                cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY planning.{vue}")
+    cache_requetes.invalider(vues)
+
+
+class Rafraichisseur(threading.Thread):
+    """Thread qui rafraîchit toutes les vues au démarrage, puis les vues
+    touchées par une écriture, ou toutes les vues à intervalle régulier."""
+
+    def __init__(self, periode=PERIODE_SECONDES, delai=DELAI_SECONDES):
+        super().__init__(name="rafraichissement-vues", daemon=True)
+        self.periode = periode
+        self.delai = delai
+        self._reveil = threading.Event()
+        self._verrou = threading.Lock()
+        self._a_rafraichir = set()
+
+    def signaler(self, tables):
+        vues = vues_de(tables)
+        if vues:
+            with self._verrou:
+                self._a_rafraichir |= vues
+            self._reveil.set()
+
+    def run(self):
+        # Écritures faites avant le démarrage (autre processus, import, cron)
+        vues = set(VUES_MATERIALISEES)
+        while True:
+            try:
+                rafraichir(vues)
+            except Exception:
+                journal.exception("Rafraîchissement des vues impossible (%s)", ", ".join(sorted(vues)))
+            if self._reveil.wait(self.periode):
+                self._reveil.clear()
+                self._reveil.wait(self.delai)
+                self._reveil.clear()
+                with self._verrou:
+                    vues, self._a_rafraichir = self._a_rafraichir, set()
+            else:
+                vues = set(VUES_MATERIALISEES)
+
+
+_rafraichisseur = None
+_verrou = threading.Lock()
+
+
+def demarrer():
+    """Démarre (une seule fois par processus) le rafraîchissement en tâche de fond."""
+    global _rafraichisseur
+    with _verrou:
+        if _rafraichisseur is None:
+            _rafraichisseur = Rafraichisseur()
+            abonner(_rafraichisseur.signaler)
+            _rafraichisseur.start()
+    return _rafraichisseur
+
+
+if __name__ == "__main__":
+    # Rafraîchissement ponctuel (cron) : python rafraichissement.py
+    rafraichir()
@@ -0,0 +1,490 @@
+# recuit.py - Amélioration d'un planning existant par recuit simulé
+import math
+import random
+import time
+from bisect import bisect_left
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from catalogue import SQL
+from db import connexion, lire_sql
+from ecriture import appliquer_optimisation
+from generation import MAX_EXAMENS_PROF_JOUR, creneaux_par_defaut, creneaux_periodes, fin_examen
+from indicateurs import PlanVectorise, comparer
+from occupation import IndexOccupation
+from instantane import examens_detailles, table
+
+# Poids des critères (pénalités à minimiser)
+POIDS = {
+    "enchaines": 10.0,       # étudiant avec des examens deux jours de suite
+    "places_perdues": 0.1,   # places vides dans les salles
+    "desequilibre": 1.0,     # écart quadratique des charges des professeurs
+}
+
+BUDGET_SECONDES = 30
+TEMPERATURE_FINALE = 1e-3   # fraction de la température initiale en fin de budget
+VERIFICATION = 256          # itérations entre deux lectures de l'horloge
+
+
+class RechercheLocale:
+    """Recuit simulé sur un planning déjà valide.
+
+    Quatre mouvements : déplacer un examen (toutes ses salles) sur un autre
+    créneau, changer une salle, échanger les salles de deux examens du même
+    créneau, changer le professeur responsable (même département). Les
+    règles dures (un examen par jour et par étudiant, salles et professeurs
+    sans chevauchement, 3 examens par jour et par professeur, capacité) ne
+    sont jamais violées ; seule la variation du coût est calculée pour
+    chaque mouvement.
+
+    df_examens : id, module_id, prof_id, salle_id, periode_id, date_heure, duree_minutes
+    df_salles : id, capacite
+    df_inscriptions : etudiant_id, module_id
+    df_profs : id, dept_id
+    creneaux : créneaux de la session (generation.creneaux_periodes / creneaux_par_defaut)
+    df_fixes : salle_id, prof_id, date_heure, duree_minutes des examens hors
+    recherche (professeur, durée ou capacité NULL) : intervalles fixes qui
+    occupent leur salle et leur professeur"""
+
+    def __init__(self, df_examens, df_salles, df_inscriptions, df_profs, creneaux, poids=POIDS,
+                 df_fixes=None):
+        self.poids = poids
+        examens = df_examens.sort_values("id").to_dict("records")
+        for e in examens:
+            e["date_heure"] = pd.Timestamp(e["date_heure"]).to_pydatetime()
+            e["periode_id"] = None if pd.isna(e["periode_id"]) else int(e["periode_id"])
+
+        # Créneaux de la session plus les horaires actuels des examens
+        debuts = {c["debut"]: c["periode_id"] for c in creneaux}
+        for e in examens:
+            debuts.setdefault(e["date_heure"], e["periode_id"])
+        self.creneaux = sorted(debuts)
+        self.periodes = [debuts[d] for d in self.creneaux]
+        indice_creneau = {d: k for k, d in enumerate(self.creneaux)}
+        premier = self.creneaux[0].date()
+        # Jours décalés de 1 : les colonnes j-1 et j+1 existent toujours
+        self.jour = [(d.date() - premier).days + 1 for d in self.creneaux]
+        nb_jours = max(self.jour) + 2
+        # Créneaux qui se chevauchent, avec la plus longue durée (estimation prudente)
+        duree = timedelta(minutes=int(df_examens["duree_minutes"].max()))
+        self.voisins = [
+            [t for t, f in enumerate(self.creneaux) if abs(f - d) < duree]
+            for d in self.creneaux
+        ]
+        self.chevauche = [set(v) for v in self.voisins]
+
+        # Salles triées par capacité : l'indice d'une salle est son rang
+        salles = df_salles.sort_values(["capacite", "id"])
+        self.salle_ids = [int(s) for s in salles["id"]]
+        self.capacites = [int(c) for c in salles["capacite"]]
+        indice_salle = {s: k for k, s in enumerate(self.salle_ids)}
+
+        self.prof_ids = [int(p) for p in df_profs["id"]]
+        indice_prof = {p: k for k, p in enumerate(self.prof_ids)}
+        # dept_id NULL : NaN n'est pas une clé de dictionnaire fiable, -1 le remplace
+        depts = df_profs["dept_id"].fillna(-1).astype(int).tolist()
+        par_dept = {}
+        for k, d in enumerate(depts):
+            par_dept.setdefault(d, []).append(k)
+        self.collegues = [par_dept[d] for d in depts]
+
+        codes, etudiants = pd.factorize(df_inscriptions["etudiant_id"])
+        par_module = {
+            m: np.asarray(g, dtype=np.int32)
+            for m, g in pd.Series(codes).groupby(df_inscriptions["module_id"].to_numpy())
+        }
+        vide = np.empty(0, dtype=np.int32)
+
+        # Unité déplacée d'un bloc : un module à un horaire (une ligne par salle)
+        self.examen_ids, self.unite = [], []
+        self.lignes, self.etudiants, self.effectif = [], [], []
+        self.creneau, self.salle, self.prof = [], [], []
+        unites = {}
+        for e in examens:
+            cle = (e["module_id"], e["date_heure"])
+            if cle not in unites:
+                unites[cle] = len(self.lignes)
+                st = par_module.get(e["module_id"], vide)
+                self.lignes.append([])
+                self.etudiants.append(st)
+                self.effectif.append(len(st))
+                self.creneau.append(indice_creneau[e["date_heure"]])
+            u = unites[cle]
+            self.lignes[u].append(len(self.examen_ids))
+            self.examen_ids.append(int(e["id"]))
+            self.unite.append(u)
+            self.salle.append(indice_salle[int(e["salle_id"])])
+            self.prof.append(indice_prof[int(e["prof_id"])])
+
+        # Durée réelle de chaque unité (la plus longue de ses lignes)
+        duree_ligne = [timedelta(minutes=int(e["duree_minutes"])) for e in examens]
+        self.duree = [max(duree_ligne[l] for l in lignes) for lignes in self.lignes]
+
+        # Examens hors recherche : intervalles fixes par indice de salle / professeur
+        self.fixes_salle, self.fixes_prof = IndexOccupation(), IndexOccupation()
+        if df_fixes is not None:
+            for e in df_fixes.to_dict("records"):
+                debut = pd.Timestamp(e["date_heure"]).to_pydatetime()
+                fin = fin_examen({**e, "date_heure": debut})
+                if not pd.isna(e["salle_id"]) and int(e["salle_id"]) in indice_salle:
+                    self.fixes_salle.ajouter(indice_salle[int(e["salle_id"])], debut, fin)
+                if not pd.isna(e["prof_id"]) and int(e["prof_id"]) in indice_prof:
+                    self.fixes_prof.ajouter(indice_prof[int(e["prof_id"])], debut, fin)
+
+        self.initial = (list(self.creneau), list(self.salle), list(self.prof))
+        self.dimensions = (len(etudiants), nb_jours)
+        self._indexer()
+
+    # ============================================
+    # ÉTAT ET COÛT
+    # ============================================
+
+    def _indexer(self):
+        """(Re)construit les occupations à partir de creneau / salle / prof."""
+        nb_creneaux = len(self.creneaux)
+        self.occ_etudiants = np.zeros(self.dimensions, dtype=np.int8)
+        self.occ_salle = [[0] * nb_creneaux for _ in self.salle_ids]
+        self.occ_prof = [[0] * nb_creneaux for _ in self.prof_ids]
+        self.prof_jour = [[0] * self.dimensions[1] for _ in self.prof_ids]
+        self.charge = [0] * len(self.prof_ids)
+        self.lignes_creneau = [[] for _ in self.creneaux]
+        self.somme_cap = [0] * len(self.lignes)
+        # Intervalles réels des lignes par salle (échanges entre durées différentes)
+        self.occupation_salles = IndexOccupation()
+
+        for u, lignes in enumerate(self.lignes):
+            s = self.creneau[u]
+            self.occ_etudiants[self.etudiants[u], self.jour[s]] += 1
+            for l in lignes:
+                self.occ_salle[self.salle[l]][s] += 1
+                self.occ_prof[self.prof[l]][s] += 1
+                self.prof_jour[self.prof[l]][self.jour[s]] += 1
+                self.charge[self.prof[l]] += 1
+                self.lignes_creneau[s].append(l)
+                self.somme_cap[u] += self.capacites[self.salle[l]]
+                self.occupation_salles.ajouter(self.salle[l], *self._intervalle(u), l)
+
+    def _intervalle(self, u, s=None):
+        debut = self.creneaux[self.creneau[u] if s is None else s]
+        return debut, debut + self.duree[u]
+
+    def _salle_libre(self, k, debut, fin, ignorees=()):
+        """Salle k libre sur [debut, fin) : examens fixes et lignes placées hors ignorees."""
+        if not self.fixes_salle.est_libre(k, debut, fin):
+            return False
+        return all(l in ignorees for l in self.occupation_salles.occupants(k, debut, fin))
+
+    def _perte(self, u, somme):
+        return max(0, somme - self.effectif[u])
+
+    def criteres(self):
+        """Valeur de chaque critère, recalculée entièrement."""
+        occ = self.occ_etudiants > 0
+        charge = np.asarray(self.charge, dtype=float)
+        return {
+            "enchaines": int((occ[:, :-1] & occ[:, 1:]).sum()),
+            "places_perdues": sum(self._perte(u, c) for u, c in enumerate(self.somme_cap)),
+            "desequilibre": float(((charge - charge.mean()) ** 2).sum()) if len(charge) else 0.0,
+        }
+
+    def cout(self):
+        return sum(self.poids[c] * v for c, v in self.criteres().items())
+
+    # ============================================
+    # MOUVEMENTS : variation du coût, None si interdit
+    # ============================================
+
+    def _delta_creneau(self, u, s2):
+        s = self.creneau[u]
+        if s2 == s:
+            return None
+        soi = 1 if s2 in self.chevauche[s] else 0
+        j, j2 = self.jour[s], self.jour[s2]
+        debut, fin = self._intervalle(u, s2)
+        profs = [self.prof[l] for l in self.lignes[u]]
+        for l, p in zip(self.lignes[u], profs):
+            if not (self.fixes_salle.est_libre(self.salle[l], debut, fin)
+                    and self.fixes_prof.est_libre(p, debut, fin)):
+                return None
+            occ_s, occ_p = self.occ_salle[self.salle[l]], self.occ_prof[p]
+            if sum(occ_s[t] for t in self.voisins[s2]) > soi:
+                return None
+            if sum(occ_p[t] for t in self.voisins[s2]) > soi:
+                return None
+            if j2 != j and self.prof_jour[p][j2] + profs.count(p) > MAX_EXAMENS_PROF_JOUR:
+                return None
+        if j2 == j:
+            return 0.0
+
+        st = self.etudiants[u]
+        if not len(st):
+            return 0.0
+        occ = self.occ_etudiants
+        if occ[st, j2].any():
+            return None
+        delta = (int(occ[st, j2 - 1].sum()) + int(occ[st, j2 + 1].sum())
+                 - int(occ[st, j - 1].sum()) - int(occ[st, j + 1].sum()))
+        if abs(j2 - j) == 1:
+            # Le jour quitté est voisin du nouveau jour
+            delta -= len(st)
+        return self.poids["enchaines"] * delta
+
+    def _deplacer(self, u, s2):
+        s = self.creneau[u]
+        j, j2 = self.jour[s], self.jour[s2]
+        avant, apres = self._intervalle(u, s), self._intervalle(u, s2)
+        for l in self.lignes[u]:
+            self.occupation_salles.retirer(self.salle[l], *avant, l)
+            self.occupation_salles.ajouter(self.salle[l], *apres, l)
+            self.occ_salle[self.salle[l]][s] -= 1
+            self.occ_salle[self.salle[l]][s2] += 1
+            self.occ_prof[self.prof[l]][s] -= 1
+            self.occ_prof[self.prof[l]][s2] += 1
+            self.prof_jour[self.prof[l]][j] -= 1
+            self.prof_jour[self.prof[l]][j2] += 1
+            self.lignes_creneau[s].remove(l)
+            self.lignes_creneau[s2].append(l)
+        if j2 != j:
+            self.occ_etudiants[self.etudiants[u], j] -= 1
+            self.occ_etudiants[self.etudiants[u], j2] += 1
+        self.creneau[u] = s2
+
+    def _delta_salle(self, l, k):
+        k0 = self.salle[l]
+        if k == k0:
+            return None
+        u = self.unite[l]
+        s = self.creneau[u]
+        occ_k = self.occ_salle[k]
+        if any(occ_k[t] for t in self.voisins[s]):
+            return None
+        if not self.fixes_salle.est_libre(k, *self._intervalle(u)):
+            return None
+        somme = self.somme_cap[u] - self.capacites[k0] + self.capacites[k]
+        if somme < min(self.effectif[u], self.somme_cap[u]):
+            return None
+        return self.poids["places_perdues"] * (self._perte(u, somme) - self._perte(u, self.somme_cap[u]))
+
+    def _changer_salle(self, l, k):
+        u, s, k0 = self.unite[l], self.creneau[self.unite[l]], self.salle[l]
+        self.occupation_salles.retirer(k0, *self._intervalle(u), l)
+        self.occupation_salles.ajouter(k, *self._intervalle(u), l)
+        self.occ_salle[k0][s] -= 1
+        self.occ_salle[k][s] += 1
+        self.somme_cap[u] += self.capacites[k] - self.capacites[k0]
+        self.salle[l] = k
+
+    def _delta_echange(self, l, l2):
+        u, u2 = self.unite[l], self.unite[l2]
+        if u == u2:
+            return None
+        # Même créneau mais durées possiblement différentes : chaque examen doit
+        # tenir dans la salle de l'autre (lignes placées et examens fixes)
+        k, k2 = self.salle[l], self.salle[l2]
+        if not (self._salle_libre(k2, *self._intervalle(u), (l, l2))
+                and self._salle_libre(k, *self._intervalle(u2), (l, l2))):
+            return None
+        c, c2 = self.capacites[k], self.capacites[k2]
+        somme, somme2 = self.somme_cap[u] - c + c2, self.somme_cap[u2] - c2 + c
+        if somme < min(self.effectif[u], self.somme_cap[u]):
+            return None
+        if somme2 < min(self.effectif[u2], self.somme_cap[u2]):
+            return None
+        delta = (self._perte(u, somme) - self._perte(u, self.somme_cap[u])
+                 + self._perte(u2, somme2) - self._perte(u2, self.somme_cap[u2]))
+        return self.poids["places_perdues"] * delta
+
+    def _echanger(self, l, l2):
+        u, u2 = self.unite[l], self.unite[l2]
+        c, c2 = self.capacites[self.salle[l]], self.capacites[self.salle[l2]]
+        self.somme_cap[u] += c2 - c
+        self.somme_cap[u2] += c - c2
+        k, k2 = self.salle[l], self.salle[l2]
+        self.occupation_salles.retirer(k, *self._intervalle(u), l)
+        self.occupation_salles.retirer(k2, *self._intervalle(u2), l2)
+        self.occupation_salles.ajouter(k2, *self._intervalle(u), l)
+        self.occupation_salles.ajouter(k, *self._intervalle(u2), l2)
+        self.salle[l], self.salle[l2] = k2, k
+
+    def _delta_prof(self, l, q):
+        p = self.prof[l]
+        if q == p:
+            return None
+        s = self.creneau[self.unite[l]]
+        occ_q = self.occ_prof[q]
+        if any(occ_q[t] for t in self.voisins[s]):
+            return None
+        if not self.fixes_prof.est_libre(q, *self._intervalle(self.unite[l])):
+            return None
+        if self.prof_jour[q][self.jour[s]] >= MAX_EXAMENS_PROF_JOUR:
+            return None
+        # Somme des carrés des charges : une unité passe de p à q
+        return self.poids["desequilibre"] * 2 * (self.charge[q] - self.charge[p] + 1)
+
+    def _changer_prof(self, l, q):
+        p, s = self.prof[l], self.creneau[self.unite[l]]
+        self.occ_prof[p][s] -= 1
+        self.occ_prof[q][s] += 1
+        self.prof_jour[p][self.jour[s]] -= 1
+        self.prof_jour[q][self.jour[s]] += 1
+        self.charge[p] -= 1
+        self.charge[q] += 1
+        self.prof[l] = q
+
+    def _proposer(self, rng):
+        """Tire un mouvement : (delta, application, arguments) ou None."""
+        tirage = rng.random()
+        if tirage < 0.4:
+            u = rng.randrange(len(self.lignes))
+            s2 = rng.randrange(len(self.creneaux))
+            return self._delta_creneau(u, s2), self._deplacer, (u, s2)
+
+        l = rng.randrange(len(self.salle))
+        if tirage < 0.65:
+            # Salle tirée parmi celles assez grandes, les plus petites plus souvent
+            u = self.unite[l]
+            besoin = min(self.effectif[u], self.somme_cap[u]) - self.somme_cap[u] + self.capacites[self.salle[l]]
+            k = bisect_left(self.capacites, besoin)
+            if k >= len(self.capacites):
+                return None, None, None
+            k += int(rng.random() ** 2 * (len(self.capacites) - k))
+            return self._delta_salle(l, k), self._changer_salle, (l, k)
+        if tirage < 0.85:
+            l2 = rng.choice(self.lignes_creneau[self.creneau[self.unite[l]]])
+            return self._delta_echange(l, l2), self._echanger, (l, l2)
+        q = rng.choice(self.collegues[self.prof[l]])
+        return self._delta_prof(l, q), self._changer_prof, (l, q)
+
+    # ============================================
+    # RECUIT
+    # ============================================
+
+    def _temperature_initiale(self, rng, essais=500):
+        """Température où un mouvement défavorable moyen est accepté une fois sur deux."""
+        hausses = []
+        for _ in range(essais):
+            delta, _, _ = self._proposer(rng)
+            if delta is not None and delta > 0:
+                hausses.append(delta)
+        return (sum(hausses) / len(hausses) if hausses else 1.0) / math.log(2)
+
+    def ameliorer(self, budget_secondes=BUDGET_SECONDES, progression=None, graine=None):
+        """Recuit pendant budget_secondes ; garde le meilleur plan rencontré.
+
+        progression : fonction(pourcentage) appelée environ une fois par seconde
+        Renvoie les statistiques de la recherche."""
+        rng = random.Random(graine)
+        cout = cout_initial = self.cout()
+        meilleur_cout, meilleur = cout, (list(self.creneau), list(self.salle), list(self.prof))
+        t0 = self._temperature_initiale(rng)
+        temperature = t0
+
+        debut = time.monotonic()
+        dernier_rapport = debut
+        iterations = acceptes = 0
+        while True:
+            if iterations % VERIFICATION == 0:
+                maintenant = time.monotonic()
+                if maintenant - debut >= budget_secondes:
+                    break
+                fraction = (maintenant - debut) / budget_secondes
+                temperature = t0 * TEMPERATURE_FINALE ** fraction
+                if cout < meilleur_cout:
+                    meilleur_cout, meilleur = cout, (list(self.creneau), list(self.salle), list(self.prof))
+                if progression and maintenant - dernier_rapport >= 1:
+                    dernier_rapport = maintenant
+                    progression(int(fraction * 100))
+            iterations += 1
+
+            delta, appliquer, arguments = self._proposer(rng)
+            if delta is None:
+                continue
+            if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+                appliquer(*arguments)
+                cout += delta
+                acceptes += 1
+
+        if cout < meilleur_cout:
+            meilleur = (list(self.creneau), list(self.salle), list(self.prof))
+        self.creneau, self.salle, self.prof = meilleur
+        self._indexer()
+
+        duree = time.monotonic() - debut
+        return {
+            "cout_initial": cout_initial,
+            "cout_final": self.cout(),
+            "criteres": self.criteres(),
+            "iterations": iterations,
+            "acceptes": acceptes,
+            "mouvements_par_seconde": int(iterations / duree) if duree else 0,
+        }
+
+    def modifications(self):
+        """Lignes d'examens modifiées : examen_id, salle_id, prof_id, date_heure, periode_id."""
+        creneau0, salle0, prof0 = self.initial
+        lignes = []
+        for l, ident in enumerate(self.examen_ids):
+            u = self.unite[l]
+            if (self.creneau[u], self.salle[l], self.prof[l]) == (creneau0[u], salle0[l], prof0[l]):
+                continue
+            s = self.creneau[u]
+            lignes.append({
+                "examen_id": ident,
+                "salle_id": self.salle_ids[self.salle[l]],
+                "prof_id": self.prof_ids[self.prof[l]],
+                "date_heure": self.creneaux[s],
+                "periode_id": self.periodes[s],
+            })
+        return lignes
+
+
+def ameliorer_session(budget_secondes=BUDGET_SECONDES, progression=None):
+    """Charge la session, l'améliore pendant le budget puis écrit les examens modifiés."""
+    df_examens = examens_detailles().dropna(subset=["prof_id", "duree_minutes", "capacite"])
+    # Les autres examens restent en place mais occupent salles et professeurs
+    examens = table("examens")
+    df_fixes = examens.loc[~examens["id"].isin(df_examens["id"]),
+                           ["salle_id", "prof_id", "date_heure", "duree_minutes"]]
+    if df_examens.empty:
+        raise ValueError("Aucun examen à améliorer")
+    df_salles = table("lieu_examen")[["id", "capacite"]].dropna(subset=["capacite"])
+    inscriptions = table("inscriptions")
+    df_inscriptions = inscriptions[inscriptions["module_id"].isin(df_examens["module_id"])]
+    df_profs = table("professeurs")[["id", "dept_id"]]
+
+    date_debut = df_examens["date_heure"].min().date()
+    date_fin = df_examens["date_heure"].max().date()
+    periodes = lire_sql(SQL["commun.periodes"], (date_debut, date_fin))
+    if periodes.empty:
+        creneaux = creneaux_par_defaut(date_debut, date_fin)
+    else:
+        creneaux = creneaux_periodes(periodes)
+
+    recherche = RechercheLocale(df_examens, df_salles, df_inscriptions, df_profs, creneaux,
+                                df_fixes=df_fixes)
+    # Recherche : 0-95 %, écriture : 95-100 %
+    suivi = (lambda p: progression(p * 95 // 100)) if progression else None
+    statistiques = recherche.ameliorer(budget_secondes, suivi)
+    modifications = recherche.modifications()
+
+    with connexion() as conn:
+        appliquer_optimisation(conn, modifications)
+
+    # Indicateurs avant / après, côte à côte
+    df_apres = df_examens.copy()
+    if modifications:
+        modif = pd.DataFrame(modifications).set_index("examen_id")
+        lignes = df_apres["id"].isin(modif.index)
+        for colonne in ("salle_id", "prof_id", "date_heure"):
+            df_apres.loc[lignes, colonne] = df_apres.loc[lignes, "id"].map(modif[colonne])
+        df_apres["capacite"] = df_apres["salle_id"].map(dict(zip(df_salles["id"], df_salles["capacite"])))
+    comparaison = comparer({
+        "Avant": PlanVectorise(df_examens, df_inscriptions),
+        "Après": PlanVectorise(df_apres, df_inscriptions),
+    })
+
+    return {
+        "statistiques": statistiques,
+        "comparaison": comparaison.rename_axis("Indicateur").reset_index().to_dict("records"),
+        "modifications": modifications,
+    }
@@ -0,0 +1,82 @@
+# salles.py - Allocation des salles au plus juste (best fit) avec répartition
+from bisect import bisect_left
+from occupation import IndexOccupation
+
+
+class AllocateurSalles:
+    """Choix des salles de planning.lieu_examen selon l'effectif.
+
+    Les salles sont triées par capacité : la plus petite salle libre qui
+    contient l'effectif est trouvée par dichotomie. Si aucune salle ne suffit,
+    l'examen est réparti sur plusieurs salles d'un même bâtiment."""
+
+    def __init__(self, df_salles, occupation=None):
+        batiments = df_salles["batiment"] if "batiment" in df_salles else [None] * len(df_salles)
+        self.salles = sorted(
+            zip(df_salles["capacite"], df_salles["id"], df_salles["nom"], batiments),
+            key=lambda s: (s[0], s[1])
+        )
+        self.capacites = [s[0] for s in self.salles]
+        self.occupation = occupation or IndexOccupation()
+
+    def _libre(self, salle, debut, fin):
+        return self.occupation.est_libre(salle[1], debut, fin)
+
+    def meilleure_salle(self, effectif, debut, fin):
+        """Plus petite salle libre de capacité >= effectif, ou None."""
+        k = bisect_left(self.capacites, effectif)
+        for salle in self.salles[k:]:
+            if self._libre(salle, debut, fin):
+                return salle
+        return None
+
+    def repartir(self, effectif, debut, fin):
+        """Répartit l'effectif sur le moins de salles possible d'un même bâtiment.
+
+        Renvoie une liste [(salle, places)] ou [] si aucun bâtiment ne suffit."""
+        par_batiment = {}
+        for salle in self.salles:
+            if self._libre(salle, debut, fin):
+                par_batiment.setdefault(salle[3], []).append(salle)
+
+        meilleure, score = [], None
+        for libres in par_batiment.values():
+            # Plus grandes salles d'abord...
+            choix, reste = [], effectif
+            for salle in reversed(libres):
+                if reste <= 0:
+                    break
+                choix.append(salle)
+                reste -= salle[0]
+            if reste > 0:
+                continue
+            # ... puis la dernière remplacée par la plus petite qui suffit
+            besoin = choix[-1][0] + reste
+            pris = {s[1] for s in choix[:-1]}
+            capacites = [s[0] for s in libres]
+            k = bisect_left(capacites, besoin)
+            while libres[k][1] in pris:
+                k += 1
+            choix[-1] = libres[k]
+
+            perte = sum(s[0] for s in choix) - effectif
+            if score is None or (len(choix), perte) < score:
+                meilleure, score = choix, (len(choix), perte)
+
+        repartition, reste = [], effectif
+        for salle in meilleure:
+            places = min(salle[0], reste)
+            repartition.append((salle, places))
+            reste -= places
+        return repartition
+
+    def allouer(self, effectif, debut, fin):
+        """Une salle au plus juste, sinon une répartition multi-salles."""
+        salle = self.meilleure_salle(effectif, debut, fin)
+        if salle is not None:
+            return [(salle, effectif)]
+        return self.repartir(effectif, debut, fin)
+
+    def reserver(self, repartition, debut, fin, ident=None):
+        for salle, _ in repartition:
+            self.occupation.ajouter(salle[1], debut, fin, ident)
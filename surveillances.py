@@ -0,0 +1,98 @@
+# surveillances.py - Affectation des surveillants (glouton avec tas)
+import heapq
+from math import ceil
+from datetime import timedelta
+from occupation import IndexOccupation
+
+ETUDIANTS_PAR_SURVEILLANT = 30
+SANS_DEPT = -1   # remplace dept_id NULL (NaN n'est pas une clé de dictionnaire fiable)
+
+
+def nb_surveillants(effectif):
+    return max(1, ceil(effectif / ETUDIANTS_PAR_SURVEILLANT))
+
+
+def affecter_surveillances(df_examens, df_profs, df_indisponibilites=None):
+    """Affecte les surveillants de toute une session en une passe.
+
+    Les examens sont traités par ordre chronologique ; pour chacun, les
+    professeurs les moins chargés (total_surveillance) sont pris dans un tas,
+    ceux du département de l'examen d'abord. Un professeur n'est jamais
+    affecté pendant un de ses examens, une autre surveillance ou une période
+    marquée indisponible dans planning.disponibilites.
+
+    df_examens : id, prof_id, periode_id, date_heure, duree_minutes, dept_id, effectif
+    df_profs : id, dept_id, total_surveillance
+    df_indisponibilites : prof_id, periode_id
+    Renvoie (affectations, non_couverts)."""
+    charge = dict(zip(df_profs["id"], df_profs["total_surveillance"].fillna(0).astype(int)))
+    dept_prof = dict(zip(df_profs["id"], df_profs["dept_id"].fillna(SANS_DEPT).astype(int)))
+    indispo = set()
+    if df_indisponibilites is not None:
+        indispo = set(zip(df_indisponibilites["prof_id"], df_indisponibilites["periode_id"]))
+
+    examens = df_examens.assign(
+        dept_id=df_examens["dept_id"].fillna(SANS_DEPT).astype(int)
+    ).sort_values("date_heure").to_dict("records")
+
+    # Un professeur est occupé pendant ses propres examens
+    occupation = IndexOccupation()
+    for e in examens:
+        fin = e["date_heure"] + timedelta(minutes=int(e["duree_minutes"]))
+        occupation.ajouter(e["prof_id"], e["date_heure"], fin, e["id"])
+
+    # Tas (charge, prof) par département et global ; entrées périmées ignorées
+    tas_dept, tas_tous = {}, []
+    for p, c in charge.items():
+        tas_dept.setdefault(dept_prof[p], []).append((c, p))
+        tas_tous.append((c, p))
+    for tas in list(tas_dept.values()) + [tas_tous]:
+        heapq.heapify(tas)
+
+    def choisir(tas, debut, fin, periode_id, exclus, besoin):
+        choisis, ecartes = [], []
+        while tas and len(choisis) < besoin:
+            c, p = heapq.heappop(tas)
+            if c != charge[p] or p in exclus:
+                if c == charge[p]:
+                    ecartes.append((c, p))
+                continue
+            if (p, periode_id) in indispo or not occupation.est_libre(p, debut, fin):
+                ecartes.append((c, p))
+                continue
+            choisis.append(p)
+        for entree in ecartes:
+            heapq.heappush(tas, entree)
+        return choisis
+
+    affectations, non_couverts = [], []
+    for e in examens:
+        debut = e["date_heure"]
+        fin = debut + timedelta(minutes=int(e["duree_minutes"]))
+        besoin = nb_surveillants(e["effectif"])
+        exclus = {e["prof_id"]}
+
+        choisis = choisir(tas_dept.get(e["dept_id"], []), debut, fin, e["periode_id"], exclus, besoin)
+        exclus |= set(choisis)
+        if len(choisis) < besoin:
+            choisis += choisir(tas_tous, debut, fin, e["periode_id"], exclus, besoin - len(choisis))
+
+        for p in choisis:
+            charge[p] += 1
+            occupation.ajouter(p, debut, fin, e["id"])
+            heapq.heappush(tas_dept[dept_prof[p]], (charge[p], p))
+            heapq.heappush(tas_tous, (charge[p], p))
+            affectations.append({
+                "examen_id": int(e["id"]),
+                "prof_id": int(p),
+                "priorite_dept": bool(dept_prof[p] == e["dept_id"] != SANS_DEPT)
+            })
+
+        if len(choisis) < besoin:
+            non_couverts.append({
+                "examen_id": int(e["id"]),
+                "date_heure": debut,
+                "Manquants": besoin - len(choisis)
+            })
+
+    return affectations, non_couverts
@@ -0,0 +1,239 @@
+# verification_plans.py - Plans d'exécution du catalogue de requêtes (catalogue.py)
+#
+# Passe chaque requête du catalogue sous EXPLAIN (sans ANALYZE : rien n'est
+# exécuté, écritures comprises) avec ses paramètres d'exemple, puis signale :
+#   - les parcours séquentiels de grandes tables, avec les colonnes à indexer ;
+#   - les index composites attendus absents de la base ;
+#   - les plans qui régressent par rapport à la référence enregistrée.
+#
+#   python verification_plans.py --charger                 # base de test dédiée
+#   python verification_plans.py --enregistrer-reference   # fixe la référence
+# Code de sortie 1 en cas d'index manquant, de requête invalide ou de régression
+# (--strict : aussi pour tout parcours séquentiel d'une grande table).
+import argparse
+import json
+import re
+import sys
+from datetime import datetime
+import psycopg2
+from psycopg2 import extensions
+import donnees_synthetiques
+from catalogue import CATALOGUE, DEBUT_EXEMPLE, FIN_EXEMPLE
+from db import connexion
+from generation import generer_faculte
+from rafraichissement import rafraichir
+
+SEUIL_GRANDE_TABLE = 10000   # lignes estimées (pg_class.reltuples)
+TOLERANCE_COUT = 0.50        # hausse du coût estimé tolérée par rapport à la référence
+REFERENCE = "plans_reference.json"
+
+# Index composites dont dépendent les pages : (table, colonnes en tête d'index)
+INDEX_ATTENDUS = [
+    ("examens", ("prof_id", "date_heure")),
+    ("inscriptions", ("module_id", "etudiant_id")),
+]
+
+_IDENTIFIANT = re.compile(r"[a-z_][a-z0-9_]*")
+
+
+# =====================================
+# LECTURE DU CATALOGUE DE LA BASE
+# =====================================
+
+def tailles_tables(cur):
+    cur.execute("""
+        SELECT c.relname, c.reltuples
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'planning' AND c.relkind IN ('r', 'm');
+    """)
+    return {table: max(lignes, 0) for table, lignes in cur.fetchall()}
+
+
+def colonnes_tables(cur):
+    cur.execute("""
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'planning';
+    """)
+    colonnes = {}
+    for table, colonne in cur.fetchall():
+        colonnes.setdefault(table, set()).add(colonne)
+    return colonnes
+
+
+def index_existants(cur):
+    """{table: [colonnes de chaque index, dans l'ordre]}"""
+    cur.execute("""
+        SELECT t.relname, array_agg(a.attname ORDER BY k.ordre)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        CROSS JOIN LATERAL unnest(x.indkey) WITH ORDINALITY AS k(attnum, ordre)
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+        WHERE n.nspname = 'planning'
+        GROUP BY t.relname, i.relname;
+    """)
+    index = {}
+    for table, colonnes in cur.fetchall():
+        index.setdefault(table, []).append(tuple(colonnes))
+    return index
+
+
+def index_manquants(index):
+    """Index de INDEX_ATTENDUS qu'aucun index existant ne couvre (même préfixe)."""
+    return [
+        (table, colonnes) for table, colonnes in INDEX_ATTENDUS
+        if not any(existant[:len(colonnes)] == colonnes for existant in index.get(table, []))
+    ]
+
+
+# =====================================
+# PLANS
+# =====================================
+
+def expliquer(cur, sql, params):
+    """Plan JSON (racine) de la requête avec ses paramètres d'exemple."""
+    requete = cur.mogrify(sql, params) if params is not None else sql.encode()
+    cur.execute(b"EXPLAIN (FORMAT JSON) " + requete)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def noeuds(plan):
+    yield plan
+    for fils in plan.get("Plans", []):
+        yield from noeuds(fils)
+
+
+def signature(plan):
+    """Ce qui est comparé d'une exécution à l'autre : coût estimé et accès aux tables."""
+    acces = sorted({
+        ":".join(filter(None, (n["Node Type"], n.get("Relation Name"), n.get("Index Name"))))
+        for n in noeuds(plan) if "Relation Name" in n
+    })
+    return {"cout": round(plan["Total Cost"], 2), "acces": acces}
+
+
+def parcours_sequentiels(plan, tailles, colonnes):
+    """Seq Scan de tables de plus de SEUIL_GRANDE_TABLE lignes :
+    [(table, lignes estimées, filtre, colonnes candidates à un index)]."""
+    trouves = []
+    for n in noeuds(plan):
+        table = n.get("Relation Name")
+        if n["Node Type"] != "Seq Scan" or tailles.get(table, 0) < SEUIL_GRANDE_TABLE:
+            continue
+        filtre = n.get("Filter", "")
+        candidates = [c for c in dict.fromkeys(_IDENTIFIANT.findall(filtre)) if c in colonnes.get(table, ())]
+        trouves.append((table, int(tailles[table]), filtre, candidates))
+    return trouves
+
+
+def analyser():
+    """Plan, signature et parcours séquentiels de chaque requête du catalogue."""
+    resultats = {}
+    with connexion() as conn:
+        # Curseur non mesuré : les EXPLAIN ne comptent pas dans mesures.py
+        with conn.cursor(cursor_factory=extensions.cursor) as cur:
+            tailles = tailles_tables(cur)
+            colonnes = colonnes_tables(cur)
+            manquants = index_manquants(index_existants(cur))
+            for nom, (sql, params) in CATALOGUE.items():
+                try:
+                    plan = expliquer(cur, sql, params)
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    resultats[nom] = {"erreur": str(e).strip()}
+                    continue
+                resultats[nom] = {
+                    **signature(plan),
+                    "sequentiels": parcours_sequentiels(plan, tailles, colonnes),
+                }
+            conn.rollback()
+    return resultats, manquants
+
+
+def regressions(resultats, reference, tolerance=TOLERANCE_COUT):
+    """[(nom, motif)] des plans moins bons que la référence."""
+    trouvees = []
+    for nom, actuel in resultats.items():
+        avant = reference.get(nom)
+        if avant is None or "erreur" in actuel or "erreur" in avant:
+            continue
+        seq_avant = {s[0] for s in avant["sequentiels"]}
+        for table in sorted({s[0] for s in actuel["sequentiels"]} - seq_avant):
+            trouvees.append((nom, f"nouveau parcours séquentiel de {table}"))
+        index_avant = {a.split(":")[-1] for a in avant["acces"] if "Index" in a}
+        index_actuels = {a.split(":")[-1] for a in actuel["acces"] if "Index" in a}
+        for index in sorted(index_avant - index_actuels):
+            trouvees.append((nom, f"n'utilise plus l'index {index}"))
+        if avant["cout"] > 0 and actuel["cout"] > avant["cout"] * (1 + tolerance):
+            trouvees.append((nom, f"coût estimé {avant['cout']:.0f} -> {actuel['cout']:.0f}"))
+    return trouvees
+
+
+def charger_donnees(graine=42):
+    """Base de test : jeu synthétique de taille faculté, session générée, statistiques à jour."""
+    donnees_synthetiques.charger(donnees_synthetiques.generer("faculte", graine))
+    generer_faculte(DEBUT_EXEMPLE, FIN_EXEMPLE)
+    rafraichir()
+    with connexion() as conn:
+        with conn.cursor() as cur:
+            for table in donnees_synthetiques.TABLES_VIDEES:
+                cur.execute(f"ANALYZE planning.{table}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vérifie les plans du catalogue de requêtes")
+    parser.add_argument("--charger", action="store_true", help="remplace les données par le jeu synthétique")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--reference", default=REFERENCE)
+    parser.add_argument("--enregistrer-reference", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE_COUT)
+    parser.add_argument("--strict", action="store_true", help="échoue aussi sur les parcours séquentiels")
+    args = parser.parse_args()
+
+    if args.charger:
+        charger_donnees(args.graine)
+
+    resultats, manquants = analyser()
+    echec = False
+
+    for table, colonnes in manquants:
+        echec = True
+        print(f"INDEX MANQUANT {table}({', '.join(colonnes)}) : "
+              f"CREATE INDEX ON planning.{table} ({', '.join(colonnes)});")
+
+    for nom, resultat in resultats.items():
+        if "erreur" in resultat:
+            echec = True
+            print(f"ERREUR {nom} : {resultat['erreur']}")
+            continue
+        for table, lignes, filtre, candidates in resultat["sequentiels"]:
+            echec = echec or args.strict
+            conseil = f" -> index sur ({', '.join(candidates)})" if candidates else ""
+            print(f"SEQ SCAN {nom} : {table} (~{lignes} lignes) {filtre}{conseil}")
+
+    if args.enregistrer_reference:
+        with open(args.reference, "w", encoding="utf-8") as f:
+            json.dump({"date": datetime.now().isoformat(timespec="seconds"), "plans": resultats},
+                      f, indent=2, ensure_ascii=False)
+        print(f"Référence enregistrée : {args.reference} ({len(resultats)} requêtes)")
+        sys.exit(1 if echec else 0)
+
+    try:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)["plans"]
+    except FileNotFoundError:
+        print("Pas de référence : lancer avec --enregistrer-reference pour en créer une")
+        reference = {}
+
+    trouvees = regressions(resultats, reference, args.tolerance)
+    for nom, motif in trouvees:
+        print(f"RÉGRESSION {nom} : {motif}")
+    if reference and not trouvees:
+        print("Aucune régression de plan par rapport à la référence")
+    sys.exit(1 if echec or trouvees else 0)